@@ -3,14 +3,25 @@ import os
 import datetime
 import random
 from dotenv import load_dotenv
-from src.config import LEAGUE_IDS, LEAGUE_EMOJIS
-from src.utils import get_active_leagues_and_matches, extract_text_from_pdf, get_detailed_stats
-from src.analyzer import analyze_match_with_gpt4
-from src.storage import save_tip, load_tips, update_tip_status, delete_tip, save_analysis, load_analyses, delete_analysis
+from src.config import LEAGUE_IDS, LEAGUE_EMOJIS, PDF_CANDIDATE_CHARS
+from src.utils import get_active_leagues_and_matches, extract_pdfs_within_budget, get_detailed_stats, get_model_probabilities
+from src.model import market_rows
+from src.jobs import ACTIVE_STATUSES, get_job_queue
+from src.http_client import get_metrics
+from src.cache import get_cache
+from src.rate_limiter import scheduler
+from src.prefetch import start_background_prefetch
+from src.fixtures import get_fixture_results
+from src.analytics import recompute
+from src.storage import get_tip_stats, save_tip, query_tips, update_tip_status, delete_tip, save_analysis, query_analyses, load_analysis, delete_analysis
 
 # Load environment variables
 load_dotenv()
 
+# Optional in-app cache warm-up for upcoming fixtures (alternatively run: python -m src.prefetch --loop)
+if os.getenv("PREFETCH_IN_APP") == "1":
+    start_background_prefetch()
+
 # Page Config
 st.set_page_config(page_title="AI Football Analyst", page_icon="⚽", layout="wide")
 
@@ -191,6 +202,55 @@ st.markdown("""
     </style>
 """ + firefly_html, unsafe_allow_html=True)
 
+# --- PAGINATION ---
+def page_offset(total, page_size, key):
+    """Renders a page selector and returns the offset of the selected page."""
+    pages = max(1, -(-total // page_size))
+    # The page lives in session state only (no widget default); filters may shrink the result set below it
+    if key not in st.session_state:
+        st.session_state[key] = 1
+    elif st.session_state[key] > pages:
+        st.session_state[key] = pages
+    page_no = st.number_input(f"Oldal (összesen {pages}, {total} találat)", min_value=1, max_value=pages, step=1, key=key)
+    return (page_no - 1) * page_size
+
+def render_prediction_card(pred):
+    """Renders one AI prediction as a card, colored by confidence."""
+    confidence = pred.get("confidence", 0)
+    market = pred.get("market", "N/A")
+    pick = pred.get("prediction", "N/A")
+    reasoning = pred.get("reasoning", "")
+    
+    # Color logic
+    color = "#4CAF50" if confidence >= 80 else "#FFC107" if confidence >= 60 else "#FF5722"
+    
+    # Custom HTML Card
+    st.markdown(f"""
+    <div class="prediction-card" style="border-left: 5px solid {color};">
+        <h3 style="margin:0; color: white;">{market}: <span style="color:{color}">{pick}</span></h3>
+        <p style="color: #ccc; font-size: 0.9em;">Magabiztosság: {confidence}%</p>
+        <p style="font-style: italic; font-size: 0.9em;">{reasoning}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+@st.fragment(run_every=2)
+def show_job_progress(job_id):
+    """Polls a queued analysis and shows its streamed output; reruns the page once it has finished."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return
+    if job["status"] not in ACTIVE_STATUSES:
+        st.rerun()
+    if job["status"] == "queued":
+        st.info("⏳ Az elemzés sorban áll... (közben nyugodtan böngéssz tovább)")
+    else:
+        st.info("⏳ Elemzés folyamatban... (közben nyugodtan böngéssz tovább)")
+    partial = job.get("partial") or {}
+    if partial.get("summary"):
+        st.info(f"**📝 Elemzés Összefoglaló:**\n\n{partial['summary']}")
+    for pred in partial.get("predictions", []):
+        render_prediction_card(pred)
+
 # --- NAVIGATION ---
 # Side-by-Side Header Layout (Parallelism)
 col_header_left, col_header_right = st.columns([1, 1.5])
@@ -200,7 +260,7 @@ with col_header_left:
 
 with col_header_right:
     # Menu aligned to the right via CSS (justify-content: flex-end)
-    page = st.radio("Navigáció", ["Elemző", "Mentett Elemzések", "Tipptörténet"], horizontal=True, label_visibility="collapsed")
+    page = st.radio("Navigáció", ["Elemző", "Mentett Elemzések", "Tipptörténet", "Teljesítmény"], horizontal=True, label_visibility="collapsed")
 
 st.markdown("---")
 
@@ -209,6 +269,8 @@ if page == "Elemző":
     st.sidebar.title("📌 Bajnokságok")
     if 'selected_match' not in st.session_state:
         st.session_state.selected_match = None
+    if 'analysis_jobs' not in st.session_state:
+        st.session_state.analysis_jobs = {} # match id -> job id
 
     selected_date = st.sidebar.date_input("Dátum választás", datetime.date.today())
     date_str = selected_date.strftime("%Y-%m-%d")
@@ -227,37 +289,90 @@ if page == "Elemző":
                 if st.sidebar.button(btn_label, key=match['id'], use_container_width=True):
                     st.session_state.selected_match = match
                     st.session_state.analysis_result = None # Reset analysis on new match
+                    st.session_state.shown_job = None # ...and show its queued analysis, if any
     else:
         st.sidebar.info("Nincs meccs a követett ligákban.")
 
+    quota = scheduler.status()
+    if scheduler.is_low():
+        st.sidebar.warning(f"⚠️ Fogyóban a RapidAPI kvóta (ma még {quota['day_remaining']} kérés). A friss adatok helyett a tárolt adatok jelennek meg, ahol lehet.")
+
+    with st.sidebar.expander("📡 RapidAPI statisztika"):
+        api_metrics = get_metrics()
+        st.caption(f"Kérések: {api_metrics['requests']} (hibás: {api_metrics['errors']}, összevont: {quota['coalesced']}, elutasított: {quota['rejected']})")
+        st.caption(f"Kvóta: {quota['minute_remaining']}/{quota['minute_limit']} percenként, {quota['day_remaining']}/{quota['day_limit']} ma")
+        st.caption(f"Letöltve: {api_metrics['bytes'] / 1024:.1f} KB")
+        st.caption(f"Válaszidő: átlag {api_metrics['latency_avg'] * 1000:.0f} ms, max {api_metrics['latency_max'] * 1000:.0f} ms")
+        cache_stats = [c for ns, c in get_cache().stats().items() if ns != "_store"]
+        if cache_stats:
+            st.caption(f"Cache: {sum(c['hits'] for c in cache_stats)} találat / {sum(c['misses'] for c in cache_stats)} hiány")
+
+    session_jobs = get_job_queue().list(st.session_state.analysis_jobs.values())
+    if session_jobs:
+        JOB_LABELS = {"queued": "⏳ sorban áll", "running": "🔄 fut", "done": "✅ kész", "failed": "❌ hiba"}
+        with st.sidebar.expander(f"🗂️ Elemzési sor ({sum(j['status'] in ACTIVE_STATUSES for j in session_jobs)} aktív)"):
+            for j in session_jobs:
+                st.caption(f"{j['match_name']}: {JOB_LABELS.get(j['status'], j['status'])}")
+
     if st.session_state.selected_match:
         match = st.session_state.selected_match
         st.header(f"Mérkőzés: {match['home']} vs {match['away']}")
         
+        # No-LLM fast path: the Poisson model, computed for the selected match's league in one pass (only while open).
+        # Only that league, so one click costs a league's worth of RapidAPI requests, not the whole day's
+        model_expander = st.expander("⚡ Statisztikai modell (GPT nélkül)", key="model_exp", on_change="rerun")
+        with model_expander:
+            if model_expander.open:
+                slate = next((matches for matches in (organized_matches or {}).values()
+                              if any(m['id'] == match['id'] for m in matches)), [match])
+                probs = get_model_probabilities(slate).get(match['id'])
+                if probs:
+                    st.caption(f"Várható gólok: hazai {probs['lambda_home']:.2f}, vendég {probs['lambda_away']:.2f}")
+                    st.dataframe(
+                        [{"Piac": market, "Tipp": pick, "Valószínűség (%)": round(p * 100, 1)} for market, pick, p in market_rows(probs)],
+                        hide_index=True, use_container_width=True
+                    )
+                else:
+                    st.info("Nincs elég adat a modellhez.")
+        
         # Analysis Form
         with st.form("analysis_form"):
             uploaded_files = st.file_uploader("Statisztikák Feltöltése (PDF)", type="pdf", accept_multiple_files=True)
+            force_refresh = st.checkbox("🔄 Új elemzés kérése (a tárolt eredmény figyelmen kívül hagyása)")
             submitted = st.form_submit_button("Elemzés Indítása 🚀")
         
         if submitted and uploaded_files:
-            with st.spinner("Adatok kinyerése és elemzés..."):
-                pdf_text = ""
-                for uploaded_file in uploaded_files:
-                    text = extract_text_from_pdf(uploaded_file)
-                    pdf_text += f"\n--- FILE: {uploaded_file.name} ---\n{text}\n"
-                
-                match_name = f"{match['home']} vs {match['away']}"
-                st.session_state.analysis_result = analyze_match_with_gpt4(pdf_text, match_name)
+            with st.spinner("Adatok kinyerése..."):
+                # Only as many pages are read as the relevance ranking can choose from
+                pdf_text, pdf_report = extract_pdfs_within_budget(uploaded_files, PDF_CANDIDATE_CHARS)
+                if pdf_report["pages_skipped"]:
+                    st.caption(f"📄 {pdf_report['pages_read']} oldal feldolgozva, {pdf_report['pages_skipped']} oldal kimaradt (a keret megtelt).")
+                stats_text = get_detailed_stats(match['home_id'], match['away_id'])
+            # The analysis runs in the background job queue; the page polls it below
+            st.session_state.analysis_jobs[match['id']] = get_job_queue().submit(match, pdf_text, stats_text, force_refresh)
+            st.session_state.analysis_result = None
+            st.session_state.shown_job = None
         elif submitted and not uploaded_files:
             st.warning("⚠️ Tölts fel legalább egy PDF-et!")
 
+        job_id = st.session_state.analysis_jobs.get(match['id'])
+        job = get_job_queue().get(job_id) if job_id else None
+        if job and job["status"] in ACTIVE_STATUSES:
+            show_job_progress(job_id)
+        elif job and st.session_state.get("shown_job") != job_id:
+            st.session_state.analysis_result = job["result"] if job["status"] == "done" else {"error": job["error"]}
+            st.session_state.shown_job = job_id
+
         # Display Results & Save Interface
         if st.session_state.get('analysis_result'):
             res = st.session_state.analysis_result
             if "error" in res:
                 st.error(res["error"])
             else:
-                st.success("Elemzés kész! 📊")
+                st.success("Elemzés kész! 📊" + (" (tárolt eredmény)" if res.get("from_cache") else ""))
+                tokens = res.get("context_tokens")
+                if tokens:
+                    st.caption(f"🧮 Kontextus: {tokens['total']}/{tokens['budget']} token (utasítások {tokens['instructions']}, tanulságok {tokens['lessons']}, statisztika {tokens['stats']}, PDF {tokens['pdf']}/{tokens['pdf_total']})")
                 
                 # Display Summary
                 summary = res.get("summary", "Nincs elérhető összefoglaló.")
@@ -282,33 +397,26 @@ if page == "Elemző":
                     
                     selected_tips = []
                     for idx, pred in enumerate(predictions):
-                        confidence = pred.get("confidence", 0)
-                        market = pred.get("market", "N/A")
-                        pick = pred.get("prediction", "N/A")
-                        reasoning = pred.get("reasoning", "")
-                        
-                        # Color logic
-                        color = "#4CAF50" if confidence >= 80 else "#FFC107" if confidence >= 60 else "#FF5722"
-                        
-                        # Custom HTML Card
-                        st.markdown(f"""
-                        <div class="prediction-card" style="border-left: 5px solid {color};">
-                            <h3 style="margin:0; color: white;">{market}: <span style="color:{color}">{pick}</span></h3>
-                            <p style="color: #ccc; font-size: 0.9em;">Magabiztosság: {confidence}%</p>
-                            <p style="font-style: italic; font-size: 0.9em;">{reasoning}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                        render_prediction_card(pred)
                         
-                        # Checkbox for selection
-                        if st.checkbox(f"Mentés: {market} - {pick}", key=f"check_{idx}"):
+                        # Checkbox for selection, optional odds for the ROI on the Teljesítmény page
+                        c_check, c_odds = st.columns([3, 1])
+                        with c_check:
+                            checked = st.checkbox(f"Mentés: {pred.get('market', 'N/A')} - {pred.get('prediction', 'N/A')}", key=f"check_{idx}")
+                        with c_odds:
+                            odds = st.number_input("Odds", min_value=1.01, value=None, step=0.05, key=f"odds_{idx}")
+                        if checked:
                             # Construct tip object to save
                             tip_to_save = {
                                 "match": f"{match['home']} vs {match['away']}",
                                 "date": match['date'],
-                                "market": market,
-                                "prediction": pick,
-                                "confidence": confidence,
-                                "reasoning": reasoning,
+                                "fixture_id": match['id'], # For the final score in Tipptörténet
+                                "league": match.get('league'),
+                                "odds": odds,
+                                "market": pred.get("market", "N/A"),
+                                "prediction": pred.get("prediction", "N/A"),
+                                "confidence": pred.get("confidence", 0),
+                                "reasoning": pred.get("reasoning", ""),
                                 "summary": summary # Save the general analysis summary
                             }
                             selected_tips.append(tip_to_save)
@@ -329,37 +437,43 @@ if page == "Elemző":
 elif page == "Mentett Elemzések":
     st.title("📚 Mentett Elemzések")
     
-    analyses = load_analyses()
+    f1, f2, f3 = st.columns([2, 2, 1])
+    with f1:
+        match_filter = st.text_input("Keresés meccsre", "")
+    with f2:
+        date_range = st.date_input("Meccs dátuma (tól-ig)", value=(), key="anal_dates")
+    with f3:
+        page_size = st.selectbox("Oldalméret", [5, 10, 25], index=1, key="anal_page_size")
+    date_from = date_range[0] if len(date_range) > 0 else None
+    date_to = date_range[1] if len(date_range) > 1 else None
     
-    if not analyses:
+    _, total = query_analyses(match_filter, date_from, date_to, limit=0)
+    
+    if not total:
         st.info("Nincs mentett elemzés.")
     else:
-        # Reverse list to show newest first
-        for analysis in reversed(analyses):
-             with st.expander(f"📅 {analysis['match_name']} ({analysis['timestamp']})"):
-                 # Reconstruct the view
-                 res = analysis['full_result']
-                 
-                 # Summary
-                 st.info(f"**📝 Elemzés Összefoglaló:**\n\n{res.get('summary', 'Nincs adat')}")
+        offset = page_offset(total, page_size, "anal_page")
+        # Newest first, only the current page is rendered
+        analyses, _ = query_analyses(match_filter, date_from, date_to, offset=offset, limit=page_size)
+        for analysis in analyses:
+             expander = st.expander(f"📅 {analysis['match_name']} ({analysis['timestamp']})", key=f"anal_exp_{analysis['id']}", on_change="rerun")
+             with expander:
+                 # The body is only loaded (and decompressed) while the expander is open
+                 full_analysis = load_analysis(analysis['id']) if expander.open else None
                  
-                 # Predictions
-                 predictions = res.get("predictions", [])
-                 for pred in predictions:
-                        confidence = pred.get("confidence", 0)
-                        market = pred.get("market", "N/A")
-                        pick = pred.get("prediction", "N/A")
-                        reasoning = pred.get("reasoning", "")
-                        
-                        color = "#4CAF50" if confidence >= 80 else "#FFC107" if confidence >= 60 else "#FF5722"
-                        
-                        st.markdown(f"""
-                        <div class="prediction-card" style="border-left: 5px solid {color};">
-                            <h3 style="margin:0; color: white;">{market}: <span style="color:{color}">{pick}</span></h3>
-                            <p style="color: #ccc; font-size: 0.9em;">Magabiztosság: {confidence}%</p>
-                            <p style="font-style: italic; font-size: 0.9em;">{reasoning}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                 if full_analysis:
+                     # Reconstruct the view
+                     res = full_analysis['full_result']
+                     
+                     # Summary
+                     st.info(f"**📝 Elemzés Összefoglaló:**\n\n{res.get('summary', 'Nincs adat')}")
+                     
+                     # Predictions
+                     predictions = res.get("predictions", [])
+                     for pred in predictions:
+                            render_prediction_card(pred)
+                 elif expander.open:
+                     st.warning("Az elemzés tartalma nem található.")
                  
                  if st.button("Törlés", key=f"del_anal_{analysis['id']}"):
                      delete_analysis(analysis['id'])
@@ -370,13 +484,29 @@ elif page == "Mentett Elemzések":
 elif page == "Tipptörténet":
     st.title("📜 Tipptörténet és Tanulás")
     
-    tips = load_tips()
+    STATUS_FILTERS = {"Mind": None, "Függőben": "pending", "Nyert": "won", "Vesztett": "lost"}
+    f1, f2, f3, f4 = st.columns([1, 2, 2, 1])
+    with f1:
+        status_filter = STATUS_FILTERS[st.selectbox("Státusz", list(STATUS_FILTERS.keys()))]
+    with f2:
+        date_range = st.date_input("Dátum (tól-ig)", value=(), key="tip_dates")
+    with f3:
+        market_filter = st.text_input("Piac", "")
+    with f4:
+        page_size = st.selectbox("Oldalméret", [10, 25, 50], index=1, key="tip_page_size")
+    date_from = date_range[0] if len(date_range) > 0 else None
+    date_to = date_range[1] if len(date_range) > 1 else None
     
-    if not tips:
+    _, total = query_tips(status_filter, date_from, date_to, market_filter, limit=0)
+    
+    if not total:
         st.info("Még nincsenek mentett tippek.")
     else:
-        # Sort by status (Pending first) then date
-        tips.sort(key=lambda x: (x.get("status") != "pending", x.get("date"), x.get("match")))
+        offset = page_offset(total, page_size, "tip_page")
+        # Sorted by status (Pending first) then date in the query; only this page is loaded
+        tips, _ = query_tips(status_filter, date_from, date_to, market_filter, offset=offset, limit=page_size)
+        # Final scores of the pending tips on this page, from the local fixture index (one batched refresh at most)
+        results = get_fixture_results([t["fixture_id"] for t in tips if t.get("status") == "pending" and t.get("fixture_id")])
         
         for tip in tips:
             # Card style
@@ -404,6 +534,9 @@ elif page == "Tipptörténet":
                 
                 # Action Buttons (only if pending)
                 if status == "pending":
+                    result = results.get(tip.get("fixture_id"))
+                    if result:
+                        st.caption(f"🏁 Végeredmény: {result['goals_home']} - {result['goals_away']} ({result['status']})")
                     c1, c2, c3 = st.columns([1, 1, 4])
                     with c1:
                         if st.button("✅ Nyert", key=f"won_{tip['id']}"):
@@ -418,3 +551,67 @@ elif page == "Tipptörténet":
                     if st.button("🗑️ Törlés", key=f"del_{tip['id']}"):
                          delete_tip(tip['id'])
                          st.rerun()
+
+
+# --- PAGE: TELJESÍTMÉNY ---
+elif page == "Teljesítmény":
+    st.title("📈 Teljesítmény")
+
+    # Materialized counters: a handful of rows, whatever the size of the tip history
+    stats = get_tip_stats()
+    overall = next((r for r in stats if r["dimension"] == "all"), None)
+
+    def pct(value):
+        return f"{value:.1f}%" if value is not None else "–"
+
+    def stats_table(rows, label):
+        return [{
+            label: r["key"],
+            "Tippek": r["tips"],
+            "Lezárt": r["settled"],
+            "Nyert": r["won"],
+            "Találati arány": pct(r["hit_rate"]),
+            "Átl. magabiztosság": pct(r["avg_confidence"]),
+            "ROI": pct(r["roi"]),
+        } for r in sorted(rows, key=lambda r: -r["tips"])]
+
+    if not overall:
+        st.info("Még nincsenek mentett tippek.")
+    else:
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Tippek", overall["tips"])
+        m2.metric("Lezárt", overall["settled"], help=f"{overall['pending']} függőben")
+        m3.metric("Találati arány", pct(overall["hit_rate"]))
+        m4.metric("ROI", pct(overall["roi"]), help=f"1 egységes tét, {overall['staked']} lezárt tipp odds-szal")
+
+        tab_market, tab_league, tab_conf = st.tabs(["Piac", "Liga", "Magabiztosság"])
+        with tab_market:
+            st.dataframe(stats_table([r for r in stats if r["dimension"] == "market"], "Piac"), hide_index=True, use_container_width=True)
+        with tab_league:
+            st.dataframe(stats_table([r for r in stats if r["dimension"] == "league"], "Liga"), hide_index=True, use_container_width=True)
+        with tab_conf:
+            # Calibration: a well-calibrated model hits about as often as it claims
+            st.caption("Kalibráció: az átlagos magabiztosság és a tényleges találati arány sávonként.")
+            conf_rows = sorted((r for r in stats if r["dimension"] == "confidence"), key=lambda r: r["key"], reverse=True)
+            st.dataframe(stats_table(conf_rows, "Sáv"), hide_index=True, use_container_width=True)
+
+        # Recomputed from the tips themselves, so only while open
+        adhoc_expander = st.expander("🔎 Egyedi szűrés (újraszámolás)", key="perf_adhoc", on_change="rerun")
+        with adhoc_expander:
+            if adhoc_expander.open:
+                GROUPINGS = {"Piac": "market_family", "Liga": "league", "Magabiztosság": "confidence_bucket", "Dátum": "date"}
+                a1, a2, a3 = st.columns(3)
+                with a1:
+                    adhoc_range = st.date_input("Dátum (tól-ig)", value=(), key="perf_dates")
+                with a2:
+                    adhoc_market = st.text_input("Piac", "", key="perf_market")
+                with a3:
+                    group_by = GROUPINGS[st.selectbox("Csoportosítás", list(GROUPINGS.keys()), key="perf_group")]
+                adhoc_tips, _ = query_tips(None, adhoc_range[0] if len(adhoc_range) > 0 else None,
+                                           adhoc_range[1] if len(adhoc_range) > 1 else None, adhoc_market, limit=-1)
+                if adhoc_tips:
+                    table = recompute(adhoc_tips, by=group_by)
+                    st.dataframe(table[[group_by, "tips", "settled", "won", "hit_rate", "avg_confidence", "roi"]].round(1),
+                                 hide_index=True, use_container_width=True)
+                else:
+                    st.info("Nincs a szűrésnek megfelelő tipp.")
@@ -0,0 +1,141 @@
+from src.config import MARKET_KEYWORDS
+
+# Tip performance analytics. Aggregate counters per dimension (overall, market family, league,
+# confidence bucket) live in the tip_stats table and are updated in the same transaction as every
+# tip write (see src/storage.py), so the dashboard reads a handful of rows whatever the history size.
+# recompute() does the same aggregation with pandas over a list of tips, for ad-hoc slicing.
+# ROI assumes a flat 1-unit stake on every settled tip that has odds.
+
+DIMENSIONS = ("all", "market", "league", "confidence")
+CONFIDENCE_BUCKETS = ((90, "90-100"), (80, "80-89"), (70, "70-79"), (60, "60-69"), (0, "0-59"))
+UNKNOWN = "ismeretlen"
+COUNTERS = ("tips", "pending", "won", "lost", "conf_sum", "staked", "returns")
+
+def ensure_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tip_stats (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            tips INTEGER NOT NULL DEFAULT 0,
+            pending INTEGER NOT NULL DEFAULT 0,
+            won INTEGER NOT NULL DEFAULT 0,
+            lost INTEGER NOT NULL DEFAULT 0,
+            conf_sum REAL NOT NULL DEFAULT 0,   -- Sum of confidence over settled tips (calibration)
+            staked INTEGER NOT NULL DEFAULT 0,  -- Settled tips with odds
+            returns REAL NOT NULL DEFAULT 0,    -- Sum of odds over won tips with odds
+            PRIMARY KEY (dimension, key)
+        )
+    """)
+
+def market_family(market):
+    lowered = (market or "").lower()
+    for keywords, family in MARKET_KEYWORDS:
+        if any(k in lowered for k in keywords):
+            return family
+    return "other"
+
+def confidence_bucket(confidence):
+    try:
+        value = float(confidence)
+    except (TypeError, ValueError):
+        return UNKNOWN
+    for low, label in CONFIDENCE_BUCKETS:
+        if value >= low:
+            return label
+    return CONFIDENCE_BUCKETS[-1][1]
+
+def _odds(tip):
+    try:
+        odds = float(tip.get("odds") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return odds if odds > 1 else 0.0
+
+def dimension_keys(tip):
+    return [
+        ("all", "all"),
+        ("market", market_family(tip.get("market"))),
+        ("league", tip.get("league") or UNKNOWN),
+        ("confidence", confidence_bucket(tip.get("confidence"))),
+    ]
+
+def _deltas(tip, status, sign):
+    won, lost = status == "won", status == "lost"
+    settled = won or lost
+    odds = _odds(tip)
+    try:
+        confidence = float(tip.get("confidence") or 0)
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return (
+        sign,
+        sign * (status == "pending"),
+        sign * won,
+        sign * lost,
+        sign * confidence if settled else 0.0,
+        sign * (settled and odds > 0),
+        sign * odds if won else 0.0,
+    )
+
+def apply_tip(conn, tip, status, sign=1):
+    """Adds (sign=1) or removes (sign=-1) one tip with the given status from all its counters."""
+    keys = dimension_keys(tip)
+    deltas = _deltas(tip, status, sign)
+    conn.executemany("INSERT OR IGNORE INTO tip_stats (dimension, key) VALUES (?, ?)", keys)
+    conn.executemany(
+        "UPDATE tip_stats SET tips = tips + ?, pending = pending + ?, won = won + ?, lost = lost + ?, "
+        "conf_sum = conf_sum + ?, staked = staked + ?, returns = returns + ? WHERE dimension = ? AND key = ?",
+        [deltas + key for key in keys]
+    )
+
+def derive(row):
+    """Adds hit rate, ROI and average confidence (all in %) to a counter row."""
+    settled = row["won"] + row["lost"]
+    return dict(
+        row,
+        settled=settled,
+        hit_rate=row["won"] / settled * 100 if settled else None,
+        avg_confidence=row["conf_sum"] / settled if settled else None,
+        roi=(row["returns"] - row["staked"]) / row["staked"] * 100 if row["staked"] else None,
+    )
+
+def tips_frame(tips):
+    """The tips as a DataFrame with the analytics dimensions and per-tip counter columns."""
+    import pandas as pd  # Import here, only ad-hoc analysis needs pandas
+
+    columns = ["id", "date", "market", "league", "confidence", "status", "odds", "market_family", "confidence_bucket"]
+    if not tips:
+        return pd.DataFrame(columns=columns + list(COUNTERS))
+    df = pd.DataFrame([{
+        "id": t.get("id"), "date": t.get("date"), "market": t.get("market"),
+        "league": t.get("league") or UNKNOWN, "confidence": t.get("confidence"), "status": t.get("status"),
+        "odds": _odds(t),
+    } for t in tips])
+    df["market_family"] = df["market"].map(market_family)
+    df["confidence_bucket"] = df["confidence"].map(confidence_bucket)
+    conf = pd.to_numeric(df["confidence"], errors="coerce").fillna(0.0)
+    won, lost = df["status"].eq("won"), df["status"].eq("lost")
+    settled = won | lost
+    df["tips"] = 1
+    df["pending"] = df["status"].eq("pending").astype(int)
+    df["won"] = won.astype(int)
+    df["lost"] = lost.astype(int)
+    df["conf_sum"] = conf.where(settled, 0.0)
+    df["staked"] = (settled & df["odds"].gt(0)).astype(int)
+    df["returns"] = df["odds"].where(won, 0.0)
+    return df
+
+def recompute(tips, by="market_family"):
+    """
+    Aggregates a list of tips (e.g. a filtered load_tips()) by one column of tips_frame
+    ("market_family", "league", "confidence_bucket", "date", ...), vectorized.
+    Returns a DataFrame with the counters plus settled, hit_rate, avg_confidence and roi.
+    """
+    df = tips_frame(tips)
+    grouped = df.groupby(by)[list(COUNTERS)].sum()
+    settled = grouped["won"] + grouped["lost"]
+    grouped["settled"] = settled
+    grouped["hit_rate"] = (grouped["won"] / settled * 100).where(settled > 0)
+    grouped["avg_confidence"] = (grouped["conf_sum"] / settled).where(settled > 0)
+    grouped["roi"] = ((grouped["returns"] - grouped["staked"]) / grouped["staked"] * 100).where(grouped["staked"] > 0)
+    return grouped.reset_index()
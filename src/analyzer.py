@@ -1,40 +1,73 @@
+import asyncio
 import os
+import hashlib
 import json
-from openai import OpenAI
+import threading
+from openai import AsyncOpenAI, OpenAI
+from src.cache import get_cache
+from src.config import ANALYSIS_CACHE_TTL, CONTEXT_TOKEN_LIMITS, PROMPT_TOKEN_BUDGET
+from src.retrieval import select_context
+from src.streaming import IncrementalJSONParser
+from src.tokens import count_tokens, counter_name, truncate_lines
 
-def get_learning_context():
-    """Retrieves 'Lost' tips to use as lessons."""
+MODEL = "gpt-4o"
+TEMPERATURE = 0.2
+ANALYSIS_CACHE_NAMESPACE = "gpt_analysis"
+
+# One client (and connection pool) per process, rebuilt only if the API key changes
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client, _client_key
+    api_key = os.getenv("OPENAI_API_KEY")
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            _client = OpenAI(api_key=api_key)
+            _client_key = api_key
+        return _client
+
+def get_async_client():
+    """A new AsyncOpenAI client; it is bound to the event loop it is used in, so callers own it."""
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Built lesson blocks, keyed by (lessons_version, lookup keys)
+_lessons_cache = {}
+MAX_LESSONS = 5 # Only use last 5 errors to avoid context bloat
+
+def get_learning_context(match_name=None):
+    """
+    Retrieves 'Lost' tips to use as lessons.
+    Lessons about the match's teams come first, from the lessons index.
+    The block is cached until the set of lost tips changes.
+    """
     try:
-        from src.storage import load_tips
-        tips = load_tips()
-        lost_tips = [t for t in tips if t.get("status") == "lost"]
+        from src.storage import get_lost_tips, lesson_keys, lessons_version
+
+        cache_key = (lessons_version(), tuple(lesson_keys(match_name)))
+        if cache_key in _lessons_cache:
+            return _lessons_cache[cache_key]
+
+        lost_tips = get_lost_tips(cache_key[1], limit=MAX_LESSONS)
         
         if not lost_tips:
-            return ""
-            
-        lessons = "TANULÁS KORÁBBI HIBÁKBÓL (EZEKET KERÜLD EL):\n"
-        for t in lost_tips[-5:]: # Only use last 5 errors to avoid context bloat
-            lessons += f"- MECCS: {t.get('match')}, TIPP: {t.get('market')} -> {t.get('prediction')}. OK: {t.get('reasoning')}. EREDMÉNY: VESZTES. (Tanulság: Légy óvatosabb az ilyen helyzetekben!)\n"
-        
+            lessons = ""
+        else:
+            lessons = "TANULÁS KORÁBBI HIBÁKBÓL (EZEKET KERÜLD EL):\n"
+            for t in lost_tips:
+                lessons += f"- MECCS: {t.get('match')}, TIPP: {t.get('market')} -> {t.get('prediction')}. OK: {t.get('reasoning')}. EREDMÉNY: VESZTES. (Tanulság: Légy óvatosabb az ilyen helyzetekben!)\n"
+
+        if len(_lessons_cache) > 256:
+            _lessons_cache.clear()
+        _lessons_cache[cache_key] = lessons
         return lessons
     except Exception as e:
         print(f"Learning error: {e}")
         return ""
 
-def analyze_match_with_gpt4(pdf_text, match_name):
-    """
-    Sends PDF text to GPT-4o for DEEP analysis and returns structured JSON.
-    """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return {"error": "Missing OpenAI API Key"}
-
-    client = OpenAI(api_key=api_key)
-    
-    # Get lessons
-    learning_context = get_learning_context()
-
-    system_prompt = f"""
+def build_system_prompt(learning_context):
+    return f"""
     Te egy elit sportfogadási elemző vagy, aki a GPT-4o modellt használja.
     A feladatod a megadott mérkőzésstatisztikák (PDF kontextus és hivatalos adatok) MÉLYREHATÓ ELEMZÉSE és nagy pontosságú előrejelzések generálása.
     
@@ -77,27 +110,159 @@ def analyze_match_with_gpt4(pdf_text, match_name):
     Kimenet szigorúan érvényes JSON legyen. Markdown formázás nélkül.
     """
 
-    user_prompt = f"""
+def build_user_prompt(match_name, stats_text, pdf_context):
+    return f"""
     MATCH: {match_name}
     
+    OFFICIAL STATS (FROM RAPIDAPI):
+    {stats_text or "Not available"}
+    
     FULL MATCH CONTEXT (FROM PDF):
-    {pdf_text[:15000]}  # Increased limit for deeper context
+    {pdf_context}
     
     Analyze this data deeply and provide the JSON output sorted by confidence.
     """
 
+def build_prompts(pdf_text, match_name, stats_text=None):
+    """
+    Builds the system and user prompts within PROMPT_TOKEN_BUDGET (counted locally, see src/tokens.py).
+    The instructions are never cut; lessons and RapidAPI stats are cut to their limits at line
+    boundaries; the PDF gets the remaining tokens, filled with its most relevant chunks.
+    Returns (system_prompt, user_prompt, token breakdown).
+    """
+    learning_context = truncate_lines(get_learning_context(match_name), CONTEXT_TOKEN_LIMITS["lessons"])
+    stats_text = truncate_lines(stats_text or "", CONTEXT_TOKEN_LIMITS["stats"])
+
+    system_prompt = build_system_prompt(learning_context)
+    fixed = count_tokens(system_prompt) + count_tokens(build_user_prompt(match_name, stats_text, ""))
+    pdf_context = select_context(pdf_text, match_name, budget=max(PROMPT_TOKEN_BUDGET - fixed, 0), size=count_tokens)
+    user_prompt = build_user_prompt(match_name, stats_text, pdf_context)
+
+    lessons_tokens = count_tokens(learning_context)
+    stats_tokens = count_tokens(stats_text)
+    pdf_tokens = count_tokens(pdf_context)
+    total = count_tokens(system_prompt) + count_tokens(user_prompt)
+    breakdown = {
+        "instructions": total - lessons_tokens - stats_tokens - pdf_tokens,
+        "lessons": lessons_tokens,
+        "stats": stats_tokens,
+        "pdf": pdf_tokens,
+        "pdf_total": count_tokens(pdf_text),
+        "total": total,
+        "budget": PROMPT_TOKEN_BUDGET,
+        "counter": counter_name(),
+    }
+    return system_prompt, user_prompt, breakdown
+
+def chat_request(system_prompt, user_prompt):
+    """Chat completion parameters of an analysis (shared by the live, async and batch-file paths)."""
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": TEMPERATURE,
+    }
+
+def cache_analysis_result(cache_key, result):
+    """Stores a finished analysis (with its context_tokens) for identical future requests."""
+    get_cache().set(ANALYSIS_CACHE_NAMESPACE, cache_key, result, ANALYSIS_CACHE_TTL)
+
+def _normalize_prompt(prompt):
+    return "\n".join(line.strip() for line in prompt.strip().splitlines() if line.strip())
+
+def analysis_cache_key(system_prompt, user_prompt, pdf_text):
+    """Content address of a request: model, temperature, normalized prompts and the full PDF text."""
+    digest = hashlib.sha256()
+    for part in (MODEL, str(TEMPERATURE), _normalize_prompt(system_prompt), _normalize_prompt(user_prompt),
+                 hashlib.sha256(pdf_text.encode("utf-8")).hexdigest()):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def stream_match_analysis(pdf_text, match_name, stats_text=None, force_refresh=False):
+    """
+    Streaming variant of analyze_match_with_gpt4. Yields events as the response arrives:
+    ("summary", text) once the summary is complete, ("prediction", dict) for each finished prediction,
+    then ("done", full_result) or ("error", message). Cached results are replayed immediately.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        yield "error", "Missing OpenAI API Key"
+        return
+
+    system_prompt, user_prompt, breakdown = build_prompts(pdf_text, match_name, stats_text)
+
+    cache = get_cache()
+    cache_key = analysis_cache_key(system_prompt, user_prompt, pdf_text)
+    if not force_refresh:
+        cached = cache.get(ANALYSIS_CACHE_NAMESPACE, cache_key)
+        if cached is not None:
+            if "summary" in cached:
+                yield "summary", cached["summary"]
+            for prediction in cached.get("predictions", []):
+                yield "prediction", prediction
+            yield "done", {**cached, "from_cache": True}
+            return
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2
-        )
-        
-        content = response.choices[0].message.content
-        return json.loads(content)
+        stream = get_client().chat.completions.create(**chat_request(system_prompt, user_prompt), stream=True)
+
+        parser = IncrementalJSONParser(fields=("summary",), arrays=("predictions",))
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            for kind, _, value in parser.feed(delta):
+                yield ("summary", value) if kind == "field" else ("prediction", value)
+
+        result = parser.result()
+        result["context_tokens"] = breakdown
+        cache_analysis_result(cache_key, result)
+        yield "done", result
+    except Exception as e:
+        yield "error", f"Analysis failed: {str(e)}"
+
+def analyze_match_with_gpt4(pdf_text, match_name, stats_text=None, force_refresh=False):
+    """
+    Sends PDF text (and the RapidAPI stats) to GPT-4o for DEEP analysis and returns structured JSON.
+    The prompt's token breakdown is returned under "context_tokens".
+    Identical requests are answered from the persistent cache ("from_cache": True) unless force_refresh is set.
+    """
+    for kind, value in stream_match_analysis(pdf_text, match_name, stats_text, force_refresh):
+        if kind == "done":
+            return value
+        if kind == "error":
+            return {"error": value}
+    return {"error": "Analysis failed: empty response"}
+
+async def analyze_match_async(client, pdf_text, match_name, stats_text=None, force_refresh=False):
+    """
+    analyze_match_with_gpt4 for asyncio callers (batch mode), with the caller's AsyncOpenAI client.
+    Uses the same prompts, token budget and result cache.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        return {"error": "Missing OpenAI API Key"}
+
+    # Prompt building (lessons lookup, BM25, token counting) and the cache are blocking work:
+    # run them off the event loop so concurrent fixtures don't serialize on them
+    def prepare():
+        system_prompt, user_prompt, breakdown = build_prompts(pdf_text, match_name, stats_text)
+        return system_prompt, user_prompt, breakdown, analysis_cache_key(system_prompt, user_prompt, pdf_text)
+
+    system_prompt, user_prompt, breakdown, cache_key = await asyncio.to_thread(prepare)
+    if not force_refresh:
+        cached = await asyncio.to_thread(get_cache().get, ANALYSIS_CACHE_NAMESPACE, cache_key)
+        if cached is not None:
+            return {**cached, "from_cache": True}
+
+    try:
+        response = await client.chat.completions.create(**chat_request(system_prompt, user_prompt))
+        result = json.loads(response.choices[0].message.content)
+        result["context_tokens"] = breakdown
+        await asyncio.to_thread(cache_analysis_result, cache_key, result)
+        return result
     except Exception as e:
         return {"error": f"Analysis failed: {str(e)}"}
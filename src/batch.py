@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import datetime
+import io
+import os
+import time
+from src.analyzer import analyze_match_async, get_async_client
+from src.config import BATCH_CONCURRENCY, BATCH_PDF_DIR, BATCH_RETRIES, PDF_CANDIDATE_CHARS
+from src.journal import Journal
+from src.rate_limiter import BACKGROUND
+from src.storage import save_analysis
+from src.utils import extract_pdfs_within_budget, fetch_active_leagues_and_matches, fetch_detailed_stats_bulk
+
+# Whole-slate batch analysis: every fixture of a date (optionally one league) that has scout PDFs in
+# BATCH_PDF_DIR/<fixture_id>/ is analyzed with bounded concurrency and saved via save_analysis.
+# Progress is journaled per fixture, so a crashed or interrupted run resumes where it stopped.
+#
+#   python -m src.batch --date 2026-10-16
+#   python -m src.batch --date 2026-10-16 --league "Premier League (ENG)" --concurrency 8
+
+RUNS_DIR = "data/batch_runs"
+RETRY_BASE_SECONDS = 2.0
+
+def fixture_pdf_dir(fixture_id, pdf_dir=BATCH_PDF_DIR):
+    return os.path.join(pdf_dir, str(fixture_id))
+
+def load_fixture_pdfs(fixture_id, pdf_dir=BATCH_PDF_DIR):
+    """The fixture's PDFs as named in-memory files (sorted by file name), or [] if it has none."""
+    directory = fixture_pdf_dir(fixture_id, pdf_dir)
+    if not os.path.isdir(directory):
+        return []
+    files = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(directory, name), "rb") as f:
+                pdf = io.BytesIO(f.read())
+            pdf.name = name
+            files.append(pdf)
+    return files
+
+def has_fixture_pdfs(fixture_id, pdf_dir=BATCH_PDF_DIR):
+    directory = fixture_pdf_dir(fixture_id, pdf_dir)
+    return os.path.isdir(directory) and any(name.lower().endswith(".pdf") for name in os.listdir(directory))
+
+def run_journal(date_str, league=None):
+    """Per-run progress records ({"id": fixture_id, "status", ...}), kept across restarts."""
+    name = date_str if not league else f"{date_str}_{''.join(c if c.isalnum() else '_' for c in league)}"
+    return Journal(os.path.join(RUNS_DIR, f"{name}.json"))
+
+def collect_fixtures(date_str, league=None):
+    organized = fetch_active_leagues_and_matches(date_str, priority=BACKGROUND)
+    return [
+        match for league_name, matches in sorted(organized.items())
+        if league is None or league_name == league
+        for match in matches
+    ]
+
+def save_fixture_analysis(fixture_id, match_name, date, result):
+    """Saves a batch result; re-running a fixture replaces its earlier batch analysis. Returns the analysis id."""
+    analysis_id = f"fixture-{fixture_id}"
+    save_analysis({
+        "id": analysis_id,
+        "match_name": match_name,
+        "date": date,
+        "fixture_id": fixture_id,
+        "full_result": result,
+        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    return analysis_id
+
+async def _analyze_fixture(client, match, stats_text, pdf_dir, retries, force_refresh):
+    files = load_fixture_pdfs(match["id"], pdf_dir)
+    if not files:
+        return {"status": "skipped", "reason": "no PDFs"}
+
+    pdf_text, _ = await asyncio.to_thread(extract_pdfs_within_budget, files, PDF_CANDIDATE_CHARS)
+    match_name = f"{match['home']} vs {match['away']}"
+    for attempt in range(retries + 1):
+        result = await analyze_match_async(client, pdf_text, match_name, stats_text, force_refresh)
+        if "error" not in result:
+            break
+        if attempt < retries:
+            await asyncio.sleep(RETRY_BASE_SECONDS * 2 ** attempt)
+    else:
+        return {"status": "failed", "error": result["error"], "attempts": retries + 1}
+
+    analysis_id = await asyncio.to_thread(save_fixture_analysis, match["id"], match_name, match["date"], result)
+    return {"status": "done", "analysis_id": analysis_id, "from_cache": bool(result.get("from_cache"))}
+
+async def run_batch(date_str, league=None, concurrency=BATCH_CONCURRENCY, retries=BATCH_RETRIES,
+                    pdf_dir=BATCH_PDF_DIR, resume=True, force_refresh=False, log=print):
+    """
+    Analyzes every fixture of the slate that has PDFs. With resume, fixtures already done in an
+    earlier run of the same slate are skipped. Returns {status: count}.
+    """
+    journal = run_journal(date_str, league)
+    done = {r["id"] for r in journal.load() if r.get("status") == "done"} if resume else set()
+    pending = [m for m in collect_fixtures(date_str, league) if m["id"] not in done]
+    # Only fixtures with PDFs get analyzed, so only they are worth the stats' RapidAPI calls
+    fixtures = [m for m in pending if has_fixture_pdfs(m["id"], pdf_dir)]
+    summary = {"done": 0, "skipped": len(pending) - len(fixtures), "failed": 0, "resumed": len(done)}
+    if summary["skipped"]:
+        log(f"Skipping {summary['skipped']} fixtures without PDFs.")
+    if not fixtures:
+        log(f"Nothing to do ({len(done)} fixtures already done).")
+        return summary
+
+    stats = await asyncio.to_thread(fetch_detailed_stats_bulk, fixtures, BACKGROUND)
+    client = get_async_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = 0
+
+    async def worker(match):
+        nonlocal finished
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                outcome = await _analyze_fixture(client, match, stats.get(match["id"]), pdf_dir, retries, force_refresh)
+            except Exception as e:
+                outcome = {"status": "failed", "error": str(e)}
+        await asyncio.to_thread(journal.put, {"id": match["id"], **outcome})
+        summary[outcome["status"]] += 1
+        finished += 1
+        detail = outcome.get("error") or outcome.get("reason") or ("cached" if outcome.get("from_cache") else "")
+        log(f"[{finished}/{len(fixtures)}] {match['home']} vs {match['away']}: {outcome['status']}"
+            f"{f' ({detail})' if detail else ''} in {time.perf_counter() - start:.1f}s")
+
+    try:
+        await asyncio.gather(*(worker(match) for match in fixtures))
+    finally:
+        await client.close()
+    log(f"Batch done: {summary}")
+    return summary
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Analyze every fixture of a date that has scout PDFs.")
+    parser.add_argument("--date", default=datetime.date.today().isoformat(), help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--league", help='only this league, e.g. "Premier League (ENG)"')
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="analyses in flight at once")
+    parser.add_argument("--retries", type=int, default=BATCH_RETRIES, help="retries per fixture on errors")
+    parser.add_argument("--pdf-dir", default=BATCH_PDF_DIR, help="directory with one sub-directory of PDFs per fixture id")
+    parser.add_argument("--no-resume", action="store_true", help="redo fixtures finished in an earlier run")
+    parser.add_argument("--force", action="store_true", help="ignore cached GPT results")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        parser.error("OPENAI_API_KEY is not set")
+    summary = asyncio.run(run_batch(
+        args.date, args.league, args.concurrency, args.retries, args.pdf_dir,
+        resume=not args.no_resume, force_refresh=args.force
+    ))
+    raise SystemExit(1 if summary["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import datetime
+import json
+import os
+from src.analyzer import analysis_cache_key, build_prompts, cache_analysis_result, chat_request, get_client
+from src.batch import collect_fixtures, has_fixture_pdfs, load_fixture_pdfs, save_fixture_analysis
+from src.config import BATCH_PDF_DIR, BATCH_TIP_MIN_CONFIDENCE, PDF_CANDIDATE_CHARS
+from src.rate_limiter import BACKGROUND
+from src.storage import load_tips, save_tip
+from src.utils import extract_pdfs_within_budget, fetch_detailed_stats_bulk
+
+# Offline batch jobs: the exact analyze_match_with_gpt4 requests of a slate are compiled into a JSONL
+# file for the OpenAI Batch API, and the results file is ingested later, independently of the export.
+# A manifest next to the requests file maps each custom_id to its fixture.
+#
+#   python -m src.batch_file export --date 2026-10-16 batch.jsonl
+#   python -m src.batch_file stub batch.jsonl results.jsonl       # local stand-in for the service
+#   python -m src.batch_file import results.jsonl --manifest batch.jsonl.manifest.json
+
+CHAT_URL = "/v1/chat/completions"
+
+def manifest_path(requests_path):
+    return f"{requests_path}.manifest.json"
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def export_requests(date_str, requests_path, league=None, pdf_dir=BATCH_PDF_DIR, log=print):
+    """
+    Writes one Batch API request per fixture with PDFs (custom_id "fixture-<id>") plus the manifest.
+    The requests are byte-for-byte what the live path would send. Returns the number of requests.
+    """
+    slate = collect_fixtures(date_str, league)
+    fixtures = [m for m in slate if has_fixture_pdfs(m["id"], pdf_dir)]
+    stats = fetch_detailed_stats_bulk(fixtures, BACKGROUND) if fixtures else {}
+    lines, manifest = [], {}
+    for match in fixtures:
+        files = load_fixture_pdfs(match["id"], pdf_dir)
+        if not files:
+            continue
+        pdf_text, _ = extract_pdfs_within_budget(files, PDF_CANDIDATE_CHARS)
+        match_name = f"{match['home']} vs {match['away']}"
+        system_prompt, user_prompt, breakdown = build_prompts(pdf_text, match_name, stats.get(match["id"]))
+
+        custom_id = f"fixture-{match['id']}"
+        lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": CHAT_URL,
+            "body": chat_request(system_prompt, user_prompt),
+        }, ensure_ascii=False))
+        manifest[custom_id] = {
+            "fixture_id": match["id"],
+            "match_name": match_name,
+            "date": match["date"],
+            "league": match.get("league"),
+            "cache_key": analysis_cache_key(system_prompt, user_prompt, pdf_text),
+            "context_tokens": breakdown,
+        }
+
+    _write_atomic(requests_path, "".join(line + "\n" for line in lines))
+    _write_atomic(manifest_path(requests_path), json.dumps(manifest, ensure_ascii=False, indent=2))
+    log(f"Exported {len(lines)} requests ({len(slate) - len(lines)} fixtures without PDFs) to {requests_path}")
+    return len(lines)
+
+def _result_content(record):
+    """The completion text of one Batch API output line, or raises ValueError."""
+    response = record.get("response") or {}
+    if record.get("error") or response.get("status_code") != 200:
+        raise ValueError(record.get("error") or f"status {response.get('status_code')}")
+    try:
+        return response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        raise ValueError("no completion in response body")
+
+def _tips_from_result(meta, result, min_confidence, existing_ids):
+    tips = []
+    for idx, pred in enumerate(result.get("predictions", [])):
+        tip_id = f"fixture-{meta['fixture_id']}-{idx}"  # Stable, so importing twice adds nothing
+        try:
+            confidence = float(pred.get("confidence", 0))
+        except (TypeError, ValueError):
+            continue  # e.g. "85%": not a usable confidence
+        if tip_id in existing_ids or confidence < min_confidence:
+            continue
+        tips.append({
+            "id": tip_id,
+            "match": meta["match_name"],
+            "date": meta["date"],
+            "fixture_id": meta["fixture_id"],
+            "league": meta.get("league"),
+            "market": pred.get("market", "N/A"),
+            "prediction": pred.get("prediction", "N/A"),
+            "confidence": pred.get("confidence", 0),
+            "reasoning": pred.get("reasoning", ""),
+            "summary": result.get("summary"),
+        })
+    return tips
+
+def import_results(results_path, manifest_file, min_confidence=BATCH_TIP_MIN_CONFIDENCE, log=print):
+    """
+    Ingests a Batch API results file: each successful result is cached like a live answer, saved
+    with save_analysis, and its predictions of at least min_confidence are saved as pending tips.
+    Returns {"imported", "failed", "unknown", "tips"}.
+    """
+    with open(manifest_file, encoding="utf-8") as f:
+        manifest = json.load(f)
+    existing_ids = {t["id"] for t in load_tips()}
+    summary = {"imported": 0, "failed": 0, "unknown": 0, "tips": 0}
+
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            meta = manifest.get(record.get("custom_id"))
+            if meta is None:
+                summary["unknown"] += 1
+                continue
+            try:
+                result = json.loads(_result_content(record))
+            except ValueError as e:
+                log(f"{record['custom_id']}: failed ({e})")
+                summary["failed"] += 1
+                continue
+
+            result["context_tokens"] = meta["context_tokens"]
+            cache_analysis_result(meta["cache_key"], result)
+            save_fixture_analysis(meta["fixture_id"], meta["match_name"], meta["date"], result)
+            tips = _tips_from_result(meta, result, min_confidence, existing_ids)
+            if tips:
+                save_tip(tips)
+                existing_ids.update(t["id"] for t in tips)
+            summary["imported"] += 1
+            summary["tips"] += len(tips)
+
+    log(f"Import done: {summary}")
+    return summary
+
+def _stub_content(body):
+    return json.dumps({"summary": "Stub analysis.", "predictions": []})
+
+def _live_content(body):
+    return get_client().chat.completions.create(**body).choices[0].message.content
+
+def stub_results(requests_path, results_path, respond=_stub_content):
+    """
+    Local stand-in for the batch service: answers every request of requests_path with respond(body)
+    and writes the results in the Batch API output format. Returns the number of results.
+    """
+    lines = []
+    with open(requests_path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            try:
+                content = respond(request["body"])
+                record = {
+                    "id": f"batch_req_{i}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": {"choices": [{"message": {"role": "assistant", "content": content}}]}},
+                    "error": None,
+                }
+            except Exception as e:
+                record = {"id": f"batch_req_{i}", "custom_id": request["custom_id"], "response": None,
+                          "error": {"message": str(e)}}
+            lines.append(json.dumps(record, ensure_ascii=False))
+    _write_atomic(results_path, "".join(line + "\n" for line in lines))
+    return len(lines)
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export GPT analyses as a batch job file, or import its results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="compile the slate's requests into a JSONL file")
+    export.add_argument("requests", help="output JSONL path (the manifest is written next to it)")
+    export.add_argument("--date", default=datetime.date.today().isoformat(), help="YYYY-MM-DD (default: today)")
+    export.add_argument("--league", help='only this league, e.g. "Premier League (ENG)"')
+    export.add_argument("--pdf-dir", default=BATCH_PDF_DIR)
+
+    ingest = commands.add_parser("import", help="ingest a JSONL results file")
+    ingest.add_argument("results")
+    ingest.add_argument("--manifest", required=True, help="the manifest written by export")
+    ingest.add_argument("--min-confidence", type=int, default=BATCH_TIP_MIN_CONFIDENCE, help="save predictions this confident as tips")
+
+    stub = commands.add_parser("stub", help="answer a requests file locally")
+    stub.add_argument("requests")
+    stub.add_argument("results")
+    stub.add_argument("--live", action="store_true", help="call the OpenAI API one request at a time instead of stubbing")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_requests(args.date, args.requests, args.league, args.pdf_dir)
+    elif args.command == "import":
+        summary = import_results(args.results, args.manifest, args.min_confidence)
+        raise SystemExit(1 if summary["failed"] else 0)
+    else:
+        count = stub_results(args.requests, args.results, _live_content if args.live else _stub_content)
+        print(f"Wrote {count} results to {args.results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Persistent response cache shared by every process/replica that mounts the same data/ directory.
+# Values are zlib-compressed JSON with a per-entry TTL; the least recently used entries are
+# evicted once the cache exceeds its size or entry limits.
+
+CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "data/response_cache.db")
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_MB", "200")) * 1024 * 1024
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "20000"))
+EVICT_EVERY = 50         # Check limits every N writes
+TOUCH_INTERVAL = 60      # Refresh last_access at most once a minute per entry
+
+class NullCache:
+    """Cache backend that stores nothing (RESPONSE_CACHE_BACKEND=none)."""
+
+    def get(self, namespace, key, track=True, allow_expired=False):
+        return None
+
+    def set(self, namespace, key, value, ttl=None):
+        pass
+
+    def delete(self, namespace, key):
+        pass
+
+    def clear(self, namespace=None):
+        pass
+
+    def stats(self):
+        return {}
+
+class SqliteCache:
+    """
+    SQLite-backed cache. ttl=None means the entry never expires (only LRU eviction removes it).
+    Hit/miss counters are kept per namespace for this process.
+    """
+
+    def __init__(self, path=CACHE_DB, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {}
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # A lost cache write only costs a refetch
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access);
+            """)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, namespace, field):
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {"hits": 0, "misses": 0, "writes": 0})
+            counters[field] += 1
+
+    def get(self, namespace, key, track=True, allow_expired=False):
+        """
+        Returns the cached value, or None on a miss or an expired entry.
+        track=False peeks without touching hit/miss counters or LRU order;
+        allow_expired=True also returns stale entries that have not been evicted yet.
+        """
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires, last_access FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        now = time.time()
+        if row is None or (not allow_expired and row[1] is not None and row[1] < now):
+            if track:
+                self._count(namespace, "misses")
+            return None
+        if not track:
+            return json.loads(zlib.decompress(row[0]))
+        if now - row[2] > TOUCH_INTERVAL:
+            with conn:
+                conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+                )
+        self._count(namespace, "hits")
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, namespace, key, value, ttl=None):
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, expires, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, blob, len(blob), now + ttl if ttl is not None else None, now)
+            )
+        self._count(namespace, "writes")
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def delete(self, namespace, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace=None):
+        conn = self._conn()
+        with conn:
+            if namespace is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones until both limits hold."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+            freed, dropped, victims = 0, 0, []
+            for key_ns, key, size in conn.execute(
+                "SELECT namespace, key, size FROM entries ORDER BY last_access"
+            ):
+                if count - dropped <= self.max_entries and total - freed <= self.max_bytes:
+                    break
+                victims.append((key_ns, key))
+                freed += size
+                dropped += 1
+            conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+
+    def stats(self):
+        """Per-namespace hit/miss/write counters of this process, plus entry count and size on disk."""
+        with self._lock:
+            stats = {ns: dict(c) for ns, c in self._counters.items()}
+        count, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        stats["_store"] = {"entries": count, "bytes": total}
+        return stats
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_cache():
+    """Returns the configured backend (RESPONSE_CACHE_BACKEND: sqlite (default) or none)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if os.getenv("RESPONSE_CACHE_BACKEND", "sqlite").lower() == "none":
+                    _backend = NullCache()
+                else:
+                    _backend = SqliteCache()
+    return _backend
+
+def set_cache_backend(backend):
+    """Plugs in a different backend (anything with get/set/delete/clear/stats)."""
+    global _backend
+    _backend = backend
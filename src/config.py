@@ -49,3 +49,58 @@ LEAGUE_EMOJIS = {
     "Europa League": "🇪🇺",
     "Conference League": "🇪🇺"
 }
+
+# Market families (keyword -> family key) used to match saved tips against the required markets.
+# Order matters: "Ázsiai Hendikep -1.5" is a handicap, not an O/U 1.5 market.
+MARKET_KEYWORDS = [
+    (("hendikep", "handicap"), "ah"),
+    (("mindkét", "btts"), "btts"),
+    (("döntetlen", "dnb", "draw no bet"), "dnb"),
+    (("dupla", "double chance"), "dc"),
+    (("1.5",), "ou15"),
+    (("2.5",), "ou25"),
+    (("1x2", "végeredmény"), "1x2"),
+]
+
+# Persistent RapidAPI response cache TTLs in seconds (see src/cache.py)
+CACHE_TTLS = {
+    "team_form": 6 * 3600,
+    "h2h": 24 * 3600,
+}
+
+# GPT analysis results, cached by the exact request (src/analyzer.py)
+ANALYSIS_CACHE_TTL = 7 * 24 * 3600
+
+# Local fixture index (src/fixtures.py): how often a date is fully re-listed,
+# and how often its unfinished fixtures are refreshed by id
+FIXTURE_REFRESH_SECONDS = {
+    "list": 6 * 3600,
+    "unfinished": 10 * 60,
+}
+
+# Background prefetch (src/prefetch.py): how many days ahead to warm, and how often
+PREFETCH_DAYS = 3
+PREFETCH_INTERVAL_MINUTES = 30
+
+# How far uploaded PDFs are read (characters); the most relevant chunks of this are put into the
+# prompt (see src/retrieval.py)
+PDF_CANDIDATE_CHARS = 60000
+
+# Input tokens per analysis request (src/analyzer.py build_prompts). Lessons and RapidAPI stats are
+# capped at their limits, the PDF context gets whatever the instructions and those leave.
+PROMPT_TOKEN_BUDGET = 12000
+CONTEXT_TOKEN_LIMITS = {
+    "lessons": 1000,
+    "stats": 1000,
+}
+
+# Batch analysis (src/batch.py): scout PDFs live in BATCH_PDF_DIR/<fixture_id>/*.pdf
+BATCH_PDF_DIR = "data/pdfs"
+BATCH_CONCURRENCY = 4
+BATCH_RETRIES = 2
+# Batch-file import (src/batch_file.py): predictions at least this confident are saved as tips
+BATCH_TIP_MIN_CONFIDENCE = 80
+
+# Background analysis jobs (src/jobs.py)
+JOB_WORKERS = 3
+JOB_RETENTION_HOURS = 24
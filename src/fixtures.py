@@ -0,0 +1,215 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from src.config import FIXTURE_REFRESH_SECONDS, LEAGUE_IDS
+from src.http_client import api_get
+from src.rate_limiter import INTERACTIVE
+
+# Local index of the fixtures in our tracked leagues, keyed by date, league, team and fixture id.
+# A date is downloaded in full only once (and re-listed rarely, in case fixtures get added);
+# after that only its not-yet-finished fixtures are refreshed, by id. Past dates whose fixtures
+# are all final are never requested again.
+
+FIXTURES_DB = "data/fixtures.db"
+TIMEZONE = "Europe/Budapest"
+
+FINISHED_STATUSES = ("FT", "AET", "PEN")
+# Statuses after which a fixture will not change anymore on that date
+FINAL_STATUSES = FINISHED_STATUSES + ("CANC", "ABD", "AWD", "WO", "PST")
+IDS_PER_REQUEST = 20  # API-Football limit for fixtures?ids=
+
+_local = threading.local()
+_schema_ready = set()
+
+def _get_conn():
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "db_path", None) == FIXTURES_DB:
+        return conn
+    os.makedirs(os.path.dirname(FIXTURES_DB), exist_ok=True)
+    conn = sqlite3.connect(FIXTURES_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    if FIXTURES_DB not in _schema_ready:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fixtures (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                kickoff TEXT NOT NULL,
+                league_id INTEGER NOT NULL,
+                home_id INTEGER NOT NULL,
+                away_id INTEGER NOT NULL,
+                home TEXT,
+                away TEXT,
+                status TEXT,
+                goals_home INTEGER,
+                goals_away INTEGER,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_fixtures_date ON fixtures(date, league_id);
+            CREATE INDEX IF NOT EXISTS idx_fixtures_league ON fixtures(league_id, date);
+            CREATE INDEX IF NOT EXISTS idx_fixtures_home ON fixtures(home_id, date);
+            CREATE INDEX IF NOT EXISTS idx_fixtures_away ON fixtures(away_id, date);
+            CREATE TABLE IF NOT EXISTS synced_dates (
+                date TEXT PRIMARY KEY,
+                listed_at REAL NOT NULL,
+                refreshed_at REAL NOT NULL,
+                complete INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        _schema_ready.add(FIXTURES_DB)
+    _local.conn = conn
+    _local.db_path = FIXTURES_DB
+    return conn
+
+def _fixture_row(fixture):
+    goals = fixture.get("goals") or {}
+    return (
+        fixture["fixture"]["id"],
+        fixture["fixture"]["date"][:10],   # YYYY-MM-DD in TIMEZONE
+        fixture["fixture"]["date"],
+        fixture["league"]["id"],
+        fixture["teams"]["home"]["id"],
+        fixture["teams"]["away"]["id"],
+        fixture["teams"]["home"]["name"],
+        fixture["teams"]["away"]["name"],
+        fixture["fixture"]["status"]["short"],
+        goals.get("home"),
+        goals.get("away"),
+        time.time(),
+    )
+
+def _upsert(conn, fixtures):
+    tracked = set(LEAGUE_IDS.values())
+    rows = [_fixture_row(f) for f in fixtures if f["league"]["id"] in tracked]
+    conn.executemany(
+        "INSERT OR REPLACE INTO fixtures (id, date, kickoff, league_id, home_id, away_id, home, away, "
+        "status, goals_home, goals_away, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    return len(rows)
+
+# --- Sync ---
+
+def refresh_fixtures(fixture_ids, priority=INTERACTIVE):
+    """Re-fetches the given fixtures by id (20 per request). Returns the number of updated fixtures."""
+    fixture_ids = list(fixture_ids)
+    updated = 0
+    conn = _get_conn()
+    for i in range(0, len(fixture_ids), IDS_PER_REQUEST):
+        chunk = fixture_ids[i:i + IDS_PER_REQUEST]
+        data = api_get("fixtures", {"ids": "-".join(str(f) for f in chunk), "timezone": TIMEZONE}, priority)
+        if data.get("response") and not data.get("errors"):
+            with conn:
+                updated += _upsert(conn, data["response"])
+    return updated
+
+def sync_date(date_str, priority=INTERACTIVE):
+    """
+    Brings the index up to date for one date, spending as few requests as possible:
+    nothing if the date is complete or was refreshed recently, otherwise a by-id refresh of the
+    unfinished fixtures, and a full listing only on first sync or every FIXTURE_REFRESH_SECONDS["list"].
+    """
+    conn = _get_conn()
+    now = time.time()
+    state = conn.execute("SELECT * FROM synced_dates WHERE date = ?", (date_str,)).fetchone()
+    if state and state["complete"]:
+        return
+
+    if state is None or now - state["listed_at"] > FIXTURE_REFRESH_SECONDS["list"]:
+        data = api_get("fixtures", {"date": date_str, "timezone": TIMEZONE}, priority)
+        # Failed calls and API errors (quota, plan: HTTP 200 with "errors" and an empty "response")
+        # must not wipe the date or count as a listing
+        if "response" not in data or data.get("errors"):
+            return  # Keep whatever we have; the next call retries
+        with conn:
+            # Fixtures moved away from this date are re-listed under their new date
+            conn.execute("DELETE FROM fixtures WHERE date = ?", (date_str,))
+            _upsert(conn, data["response"])
+            conn.execute(
+                "INSERT OR REPLACE INTO synced_dates (date, listed_at, refreshed_at, complete) VALUES (?, ?, ?, 0)",
+                (date_str, now, now)
+            )
+    elif now - state["refreshed_at"] > FIXTURE_REFRESH_SECONDS["unfinished"]:
+        placeholders = ", ".join("?" * len(FINAL_STATUSES))
+        open_ids = [r["id"] for r in conn.execute(
+            f"SELECT id FROM fixtures WHERE date = ? AND status NOT IN ({placeholders})",
+            (date_str,) + FINAL_STATUSES
+        )]
+        refresh_fixtures(open_ids, priority)
+        with conn:
+            conn.execute("UPDATE synced_dates SET refreshed_at = ? WHERE date = ?", (now, date_str))
+
+    # A past date whose fixtures are all final never needs the network again
+    if date_str < datetime.date.today().isoformat():
+        placeholders = ", ".join("?" * len(FINAL_STATUSES))
+        open_count = conn.execute(
+            f"SELECT COUNT(*) FROM fixtures WHERE date = ? AND status NOT IN ({placeholders})",
+            (date_str,) + FINAL_STATUSES
+        ).fetchone()[0]
+        if open_count == 0:
+            with conn:
+                conn.execute("UPDATE synced_dates SET complete = 1 WHERE date = ?", (date_str,))
+
+# --- Queries ---
+
+def _match_info(row):
+    return {
+        "home": row["home"],
+        "away": row["away"],
+        "home_id": row["home_id"],
+        "away_id": row["away_id"],
+        "time": row["kickoff"][11:16], # HH:MM
+        "date": row["date"],
+        "id": row["id"],
+        "status": row["status"],
+    }
+
+def get_matches_for_date(date_str):
+    """Returns { league_name: [match_info, ...] } from the index, ordered by kickoff."""
+    id_to_league_name = {v: k for k, v in LEAGUE_IDS.items()}
+    organized = {}
+    for row in _get_conn().execute("SELECT * FROM fixtures WHERE date = ? ORDER BY kickoff, id", (date_str,)):
+        league_name = id_to_league_name.get(row["league_id"])
+        if league_name:
+            organized.setdefault(league_name, []).append(dict(_match_info(row), league=league_name))
+    return organized
+
+def get_fixture(fixture_id):
+    """Returns one indexed fixture as a dict (with goals_home/goals_away), or None."""
+    row = _get_conn().execute("SELECT * FROM fixtures WHERE id = ?", (fixture_id,)).fetchone()
+    return dict(row) if row else None
+
+def latest_finished_fixture(team_id, opponent_id=None):
+    """Most recent finished indexed fixture of a team (optionally against one opponent), or None."""
+    placeholders = ", ".join("?" * len(FINISHED_STATUSES))
+    sql = (f"SELECT * FROM fixtures WHERE (home_id = ? OR away_id = ?) AND status IN ({placeholders})")
+    params = [team_id, team_id, *FINISHED_STATUSES]
+    if opponent_id is not None:
+        sql += " AND (home_id = ? OR away_id = ?)"
+        params += [opponent_id, opponent_id]
+    row = _get_conn().execute(sql + " ORDER BY kickoff DESC LIMIT 1", params).fetchone()
+    return dict(row) if row else None
+
+def get_fixture_results(fixture_ids, priority=INTERACTIVE):
+    """
+    Final scores for settling tips: { fixture_id: {"status", "goals_home", "goals_away"} } for the finished ones.
+    Unknown or unfinished fixtures are refreshed by id (batched), at most every FIXTURE_REFRESH_SECONDS["unfinished"].
+    """
+    now = time.time()
+    fixtures = {fid: get_fixture(fid) for fid in set(fixture_ids)}
+    stale = [fid for fid, f in fixtures.items()
+             if f is None or (f["status"] not in FINAL_STATUSES
+                              and now - f["updated_at"] > FIXTURE_REFRESH_SECONDS["unfinished"])]
+    if stale:
+        refresh_fixtures(stale, priority)
+        fixtures.update({fid: get_fixture(fid) for fid in stale})
+    return {
+        fid: {"status": f["status"], "goals_home": f["goals_home"], "goals_away": f["goals_away"]}
+        for fid, f in fixtures.items() if f and f["status"] in FINISHED_STATUSES
+    }
+
+def get_fixture_result(fixture_id, priority=INTERACTIVE):
+    """Final score of one fixture (see get_fixture_results), or None if it has not finished."""
+    return get_fixture_results([fixture_id], priority).get(fixture_id)
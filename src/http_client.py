@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.cache import get_cache
+from src.rate_limiter import INTERACTIVE, QuotaExceeded, scheduler
+
+# Shared, pooled HTTP client for the API-Football host on RapidAPI.
+# Every RapidAPI call goes through api_get() so it gets keep-alive, timeouts, retries, metrics and
+# the quota-aware scheduler (src/rate_limiter.py).
+
+API_HOST = "api-football-v1.p.rapidapi.com"
+BASE_URL = f"https://{API_HOST}/v3"
+
+CONNECT_TIMEOUT = float(os.getenv("RAPIDAPI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("RAPIDAPI_READ_TIMEOUT", "20"))
+MAX_RETRIES = int(os.getenv("RAPIDAPI_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("RAPIDAPI_BACKOFF", "0.5"))  # 0.5s, 1s, 2s ...
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics = {"requests": 0, "errors": 0, "bytes": 0, "latency_total": 0.0, "latency_max": 0.0, "endpoints": {}}
+
+def get_session():
+    """Returns the process-wide keep-alive session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=("GET",),
+                    respect_retry_after_header=True,
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.headers.update({"x-rapidapi-host": API_HOST})
+                _session = session
+    return _session
+
+def _record(endpoint, latency, size, error):
+    with _metrics_lock:
+        _metrics["requests"] += 1
+        _metrics["errors"] += int(error)
+        _metrics["bytes"] += size
+        _metrics["latency_total"] += latency
+        _metrics["latency_max"] = max(_metrics["latency_max"], latency)
+        ep = _metrics["endpoints"].setdefault(endpoint, {"requests": 0, "errors": 0, "bytes": 0, "latency_total": 0.0})
+        ep["requests"] += 1
+        ep["errors"] += int(error)
+        ep["bytes"] += size
+        ep["latency_total"] += latency
+
+def get_metrics():
+    """Returns a snapshot of request counts, response bytes and latency (overall and per endpoint)."""
+    with _metrics_lock:
+        snapshot = {k: v for k, v in _metrics.items() if k != "endpoints"}
+        snapshot["endpoints"] = {k: dict(v) for k, v in _metrics["endpoints"].items()}
+    count = snapshot["requests"]
+    snapshot["latency_avg"] = snapshot["latency_total"] / count if count else 0.0
+    return snapshot
+
+def _request_key(endpoint, params):
+    return f"{endpoint}?{json.dumps(params or {}, sort_keys=True)}"
+
+def _send(endpoint, params, api_key):
+    start = time.perf_counter()
+    size, error = 0, True
+    try:
+        response = get_session().get(
+            f"{BASE_URL}/{endpoint}",
+            headers={"x-rapidapi-key": api_key},
+            params=params,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        )
+        size = len(response.content)
+        scheduler.update_from_headers({k.lower(): v for k, v in response.headers.items()})
+        response.raise_for_status()
+        data = response.json()
+        error = False
+        return data
+    except Exception as e:
+        print(f"RapidAPI request failed ({endpoint} {params}): {e}")
+        return {}
+    finally:
+        _record(endpoint, time.perf_counter() - start, size, error)
+
+def api_get(endpoint, params=None, priority=INTERACTIVE):
+    """
+    GET {BASE_URL}/{endpoint} with the RapidAPI key, scheduled against the quota.
+    Identical concurrent requests share one HTTP call.
+    Returns the parsed JSON, or {} on any failure (missing key, no quota, timeout, exhausted retries, bad JSON).
+    """
+    api_key = os.getenv("RAPIDAPI_KEY")
+    if not api_key:
+        return {}
+
+    try:
+        return scheduler.run(_request_key(endpoint, params), lambda: _send(endpoint, params, api_key), priority)
+    except QuotaExceeded as e:
+        print(f"RapidAPI request skipped ({endpoint} {params}): {e}")
+        return {}
+
+def cached_api_get(endpoint, params=None, ttl=None, namespace="rapidapi", key=None, priority=INTERACTIVE):
+    """
+    api_get() behind the persistent response cache (src/cache.py).
+    By default entries are keyed by the request; pass namespace/key to share one entry between
+    equivalent requests. Only successful responses without API errors are cached; ttl=None never expires.
+    If the request fails (e.g. quota exhausted), a stale cached entry is served instead.
+    """
+    cache = get_cache()
+    if key is None:
+        key = _request_key(endpoint, params)
+    data = cache.get(namespace, key)
+    if data is not None:
+        return data
+
+    data = api_get(endpoint, params, priority)
+    if data and not data.get("errors"):
+        cache.set(namespace, key, data, ttl)
+        return data
+    stale = cache.get(namespace, key, track=False, allow_expired=True)
+    return stale if stale is not None else data
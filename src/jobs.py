@@ -0,0 +1,136 @@
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.analyzer import stream_match_analysis
+from src.config import JOB_RETENTION_HOURS, JOB_WORKERS
+from src.journal import Journal
+
+# Process-local queue for GPT analyses, so the work survives Streamlit reruns and users can queue
+# several matches. Jobs run on a small worker pool; their state (including partial streamed output)
+# is polled by id. Identical jobs that are still queued or running are shared instead of repeated.
+# Finished jobs are persisted in data/jobs.json and kept for JOB_RETENTION_HOURS.
+
+JOBS_FILE = "data/jobs.json"
+ACTIVE_STATUSES = ("queued", "running")
+
+class JobQueue:
+    def __init__(self, path=JOBS_FILE, workers=JOB_WORKERS):
+        self._journal = Journal(path)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._inflight = {}  # dedup key -> job id
+        self._loaded = False
+
+    def _load(self):
+        """Loads persisted jobs once; jobs that were active when the process died are marked interrupted."""
+        if self._loaded:
+            return
+        cutoff = time.time() - JOB_RETENTION_HOURS * 3600
+        for record in self._journal.load():
+            if record.get("submitted_at", 0) < cutoff:
+                self._journal.delete(record["id"])
+                continue
+            if record["status"] in ACTIVE_STATUSES:
+                record = dict(record, status="failed", error="Interrupted by a restart", partial=None)
+                self._journal.put(record)
+            self._jobs[record["id"]] = dict(record)
+        self._loaded = True
+
+    def submit(self, match, pdf_text, stats_text=None, force_refresh=False):
+        """Queues an analysis of match (a match_info dict). Returns the job id (an existing one for duplicates)."""
+        match_name = f"{match['home']} vs {match['away']}"
+        digest = hashlib.sha256()
+        for part in (str(match.get("id")), match_name, pdf_text, stats_text or "", str(bool(force_refresh))):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        key = digest.hexdigest()
+
+        with self._lock:
+            self._load()
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                return job_id
+            job_id = str(uuid.uuid4())
+            self._jobs[job_id] = {
+                "id": job_id,
+                "match": match,
+                "match_name": match_name,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "partial": {"summary": None, "predictions": []},
+            }
+            self._inflight[key] = job_id
+            record = self._record(job_id)
+        self._journal.put(record)
+        self._pool.submit(self._run, job_id, key, match_name, pdf_text, stats_text, force_refresh)
+        return job_id
+
+    def _record(self, job_id):
+        job = self._jobs[job_id]
+        return {k: v for k, v in job.items() if k != "partial"}
+
+    def _run(self, job_id, key, match_name, pdf_text, stats_text, force_refresh):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        result, error = None, None
+        try:
+            for kind, value in stream_match_analysis(pdf_text, match_name, stats_text, force_refresh):
+                with self._lock:
+                    if kind == "summary":
+                        job["partial"]["summary"] = value
+                    elif kind == "prediction":
+                        job["partial"]["predictions"].append(value)
+                if kind == "done":
+                    result = value
+                elif kind == "error":
+                    error = value
+        except Exception as e:
+            error = f"Analysis failed: {str(e)}"
+
+        with self._lock:
+            job["status"] = "done" if result is not None else "failed"
+            job["result"] = result
+            job["error"] = error if result is None else None
+            job["finished_at"] = time.time()
+            job["partial"] = None
+            self._inflight.pop(key, None)
+            record = self._record(job_id)
+        self._journal.put(record)
+
+    def get(self, job_id):
+        """A snapshot of the job (status, partial output while running, result or error), or None."""
+        with self._lock:
+            self._load()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            if job.get("partial"):
+                snapshot["partial"] = {"summary": job["partial"]["summary"],
+                                       "predictions": list(job["partial"]["predictions"])}
+            return snapshot
+
+    def list(self, job_ids=None):
+        """Snapshots of the given jobs (or all), newest first."""
+        with self._lock:
+            self._load()
+            ids = list(self._jobs) if job_ids is None else [i for i in job_ids if i in self._jobs]
+        jobs = [self.get(i) for i in ids]
+        return sorted((j for j in jobs if j), key=lambda j: j["submitted_at"], reverse=True)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """The process-wide queue (shared by every Streamlit session of this server)."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
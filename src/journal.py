@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Compact the journal into the snapshot once it grows past this size
+COMPACT_BYTES = 1024 * 1024
+
+# On-disk JSON is written without pretty-printing
+COMPACT = (",", ":")
+
+class FileLock:
+    """
+    Inter-process lock on a lock file (flock on POSIX, msvcrt on Windows).
+    Also holds a thread lock, because flock does not exclude threads of the same process.
+    Windows has no shared mode, there every lock is exclusive.
+    """
+
+    _thread_locks = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path, shared=False):
+        self.path = path
+        self.shared = shared
+        with FileLock._registry_lock:
+            self._thread_lock = FileLock._thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+        self._fh = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fh = open(self.path, "a+")
+            if fcntl:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+        except Exception:
+            if self._fh:
+                self._fh.close()
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+            self._thread_lock.release()
+
+class GroupCommitter:
+    """
+    Batches writes from concurrent threads into one flush.
+    The first waiting thread becomes the leader and flushes everything queued so far;
+    the others block until the batch containing their op is durable.
+    flush(ops) must return one result per op and apply all of them or none; if a batch fails,
+    its ops are retried one at a time so an error only reaches the thread whose op caused it.
+    """
+
+    def __init__(self, flush):
+        self._flush = flush
+        self._cond = threading.Condition()
+        self._pending = []
+        self._flushing = False
+
+    def submit(self, op):
+        entry = {"op": op, "done": False, "result": None, "error": None}
+        with self._cond:
+            self._pending.append(entry)
+            while not entry["done"] and self._flushing:
+                self._cond.wait()
+            if entry["done"]:
+                return self._finish(entry)
+            # Become the leader for everything queued so far
+            self._flushing = True
+            batch, self._pending = self._pending, []
+
+        try:
+            results, errors = self._flush([e["op"] for e in batch]), [None] * len(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                results, errors = [None], [e]
+            else:
+                # The failed flush was all-or-nothing; redo the ops one by one so only the bad one fails
+                results, errors = self._flush_each(batch)
+
+        with self._cond:
+            for e, result, error in zip(batch, results, errors):
+                e["result"], e["error"], e["done"] = result, error, True
+            self._flushing = False
+            self._cond.notify_all()
+        return self._finish(entry)
+
+    def _flush_each(self, batch):
+        results, errors = [], []
+        for e in batch:
+            try:
+                results.append(self._flush([e["op"]])[0])
+                errors.append(None)
+            except Exception as error:
+                results.append(None)
+                errors.append(error)
+        return results, errors
+
+    @staticmethod
+    def _finish(entry):
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry["result"]
+
+class Journal:
+    """
+    Record store made of a JSON snapshot plus an append-only journal of
+    {"op": "put", "record": {...}} / {"op": "del", "id": ...} lines.
+    Appends are group committed (one fsync per batch) under an inter-process lock,
+    and the journal is periodically folded into the snapshot via atomic rename.
+    Replaying is idempotent, so a crash between rename and truncate loses nothing.
+    The replayed records are cached in-process and revalidated against the files' mtime and size;
+    our own writes patch the cache in place.
+    """
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        self.lock_path = snapshot_path + ".lock"
+        self._committer = GroupCommitter(self._write_batch)
+        self._cache_lock = threading.Lock()
+        self._cache_sig = None
+        self._cache = {}
+
+    # --- Reading ---
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return []
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return []
+
+    def _signature(self):
+        sig = []
+        for path in (self.snapshot_path, self.journal_path):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _replay(self, records):
+        by_id = {r.get("id"): r for r in records}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write at the tail
+                    if entry["op"] == "put":
+                        by_id[entry["record"]["id"]] = entry["record"]
+                    elif entry["op"] == "del":
+                        by_id.pop(entry["id"], None)
+        return by_id
+
+    def load(self):
+        """Returns the current records (snapshot + journal). Treat them as read-only."""
+        with self._cache_lock:
+            if self._cache_sig is not None and self._cache_sig == self._signature():
+                return list(self._cache.values())
+        with FileLock(self.lock_path, shared=True):
+            sig = self._signature()
+            records = self._replay(self._read_snapshot())
+        with self._cache_lock:
+            self._cache_sig, self._cache = sig, records
+        return list(records.values())
+
+    # --- Writing ---
+
+    def put(self, record):
+        self._committer.submit({"op": "put", "record": record})
+
+    def delete(self, record_id):
+        self._committer.submit({"op": "del", "id": record_id})
+
+    def _write_batch(self, ops):
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        payload = "".join(json.dumps(op, ensure_ascii=False, separators=COMPACT) + "\n" for op in ops)
+        with FileLock(self.lock_path):
+            sig_before = self._signature()
+            with open(self.journal_path, "a+b") as f:
+                # Never glue new entries onto a torn (newline-less) tail
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        payload = "\n" + payload
+                f.write(payload.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if size > COMPACT_BYTES:
+                self._compact_locked()
+            self._patch_cache(ops, sig_before, self._signature())
+        return [None] * len(ops)
+
+    def _patch_cache(self, ops, sig_before, sig_after):
+        with self._cache_lock:
+            if self._cache_sig is None or self._cache_sig != sig_before:
+                self._cache_sig = None  # Someone else wrote in between, reload next time
+                return
+            for op in ops:
+                if op["op"] == "put":
+                    self._cache[op["record"]["id"]] = op["record"]
+                elif op["op"] == "del":
+                    self._cache.pop(op["id"], None)
+            self._cache_sig = sig_after
+
+    def compact(self):
+        """Folds the journal into the snapshot."""
+        with FileLock(self.lock_path):
+            sig_before = self._signature()
+            self._compact_locked()
+            self._patch_cache([], sig_before, self._signature())
+
+    def _compact_locked(self):
+        records = self._replay(self._read_snapshot())
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(records.values()), f, ensure_ascii=False, separators=COMPACT)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Truncate only after the snapshot is durable
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# Statistical baseline for every required market: a Poisson goal model fitted on the finished
+# fixtures we already fetch (each team's last matches). Attack and defence strengths come from
+# goals scored/conceded relative to the sample's home and away averages, shrunk towards average
+# because the samples are small. A whole slate is scored in one vectorized pass.
+
+MAX_GOALS = 10             # Score matrix covers 0..MAX_GOALS goals per side
+PRIOR_MATCHES = 3          # Pseudo-matches of league-average play added to every team
+DEFAULT_HOME_GOALS = 1.5   # Fallbacks when the sample is empty
+DEFAULT_AWAY_GOALS = 1.2
+AH_LINES = (-2.5, -2.0, -1.5, -1.0, -0.5, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5)
+
+_GOALS = np.arange(MAX_GOALS + 1)
+_LOG_FACTORIALS = np.cumsum(np.log(np.maximum(_GOALS, 1)))
+
+def matches_frame(fixture_lists):
+    """
+    Flattens API-Football fixture responses (e.g. several teams' last matches) into one frame of
+    finished matches, one row per fixture: fixture_id, home_id, away_id, goals_home, goals_away.
+    """
+    rows = {}
+    for data in fixture_lists:
+        for m in (data or {}).get("response") or []:
+            goals_home, goals_away = m["goals"]["home"], m["goals"]["away"]
+            if goals_home is None or goals_away is None:
+                continue
+            rows[m["fixture"]["id"]] = (m["fixture"]["id"], m["teams"]["home"]["id"], m["teams"]["away"]["id"],
+                                        goals_home, goals_away)
+    columns = ["fixture_id", "home_id", "away_id", "goals_home", "goals_away"]
+    # Explicit dtypes: an empty frame (no data, API errors) would otherwise be object-typed
+    return pd.DataFrame(list(rows.values()), columns=columns).astype({c: "int64" for c in columns})
+
+def team_strengths(matches):
+    """Returns (strengths indexed by team_id with columns attack/defence, mean home goals, mean away goals)."""
+    if matches.empty:
+        return pd.DataFrame(columns=["attack", "defence"], dtype=float), DEFAULT_HOME_GOALS, DEFAULT_AWAY_GOALS
+    mu_home = matches["goals_home"].mean()
+    mu_away = matches["goals_away"].mean()
+    mu = (mu_home + mu_away) / 2 or 1.0
+
+    per_team = pd.concat([
+        matches.rename(columns={"home_id": "team_id", "goals_home": "scored", "goals_away": "conceded"})[["team_id", "scored", "conceded"]],
+        matches.rename(columns={"away_id": "team_id", "goals_away": "scored", "goals_home": "conceded"})[["team_id", "scored", "conceded"]],
+    ]).groupby("team_id").agg(scored=("scored", "sum"), conceded=("conceded", "sum"), played=("scored", "size"))
+
+    shrunk = per_team["played"] + PRIOR_MATCHES
+    strengths = pd.DataFrame({
+        "attack": (per_team["scored"] + PRIOR_MATCHES * mu) / shrunk / mu,
+        "defence": (per_team["conceded"] + PRIOR_MATCHES * mu) / shrunk / mu,
+    })
+    return strengths, mu_home or DEFAULT_HOME_GOALS, mu_away or DEFAULT_AWAY_GOALS
+
+def _poisson_pmf(rates):
+    """(n,) rates -> (n, MAX_GOALS + 1) probabilities, the tail folded into the last bucket."""
+    pmf = np.exp(np.log(rates)[:, None] * _GOALS[None, :] - rates[:, None] - _LOG_FACTORIALS[None, :])
+    pmf[:, -1] += np.clip(1.0 - pmf.sum(axis=1), 0.0, None)
+    return pmf
+
+def predict(fixtures, matches):
+    """
+    Market probabilities (0-1) for fixtures (dicts with id, home_id, away_id), fitted on the finished
+    matches frame. Returns { fixture_id: {...} } in one batched pass over the whole slate.
+    Fixtures where neither team appears in the matches (no data, API errors) are left out.
+    """
+    if not fixtures:
+        return {}
+    strengths, mu_home, mu_away = team_strengths(matches)
+    ids = [f["id"] for f in fixtures]
+    home = strengths.reindex([f["home_id"] for f in fixtures]).fillna(1.0).to_numpy(dtype=float)
+    away = strengths.reindex([f["away_id"] for f in fixtures]).fillna(1.0).to_numpy(dtype=float)
+    lam_home = np.maximum(home[:, 0] * away[:, 1] * mu_home, 0.05)
+    lam_away = np.maximum(away[:, 0] * home[:, 1] * mu_away, 0.05)
+
+    # Score matrices: p[n, i, j] = P(home scores i, away scores j)
+    p = _poisson_pmf(lam_home)[:, :, None] * _poisson_pmf(lam_away)[:, None, :]
+    diff = _GOALS[:, None] - _GOALS[None, :]
+    total = _GOALS[:, None] + _GOALS[None, :]
+
+    home_win = (p * (diff > 0)).sum(axis=(1, 2))
+    draw = (p * (diff == 0)).sum(axis=(1, 2))
+    away_win = (p * (diff < 0)).sum(axis=(1, 2))
+    over15 = (p * (total > 1.5)).sum(axis=(1, 2))
+    over25 = (p * (total > 2.5)).sum(axis=(1, 2))
+    btts = p[:, 1:, 1:].sum(axis=(1, 2))
+    ah = {
+        line: ((p * (diff + line > 0)).sum(axis=(1, 2)), (p * (diff + line == 0)).sum(axis=(1, 2)))
+        for line in AH_LINES
+    }
+
+    known = set(strengths.index)
+    results = {}
+    for n, fixture_id in enumerate(ids):
+        if fixtures[n]["home_id"] not in known and fixtures[n]["away_id"] not in known:
+            continue
+        handicaps = {}
+        for line, (win, push) in ah.items():
+            handicaps[line] = {"home": float(win[n]), "push": float(push[n]), "away": float(1 - win[n] - push[n])}
+        # Main line: where the home side's chance (pushes refunded) is closest to even
+        main_line = min(AH_LINES, key=lambda line: abs(
+            handicaps[line]["home"] / max(1 - handicaps[line]["push"], 1e-9) - 0.5))
+        results[fixture_id] = {
+            "lambda_home": float(lam_home[n]),
+            "lambda_away": float(lam_away[n]),
+            "1x2": {"1": float(home_win[n]), "X": float(draw[n]), "2": float(away_win[n])},
+            "ou15": {"over": float(over15[n]), "under": float(1 - over15[n])},
+            "ou25": {"over": float(over25[n]), "under": float(1 - over25[n])},
+            "btts": {"yes": float(btts[n]), "no": float(1 - btts[n])},
+            "dnb": {"1": float(home_win[n] / max(home_win[n] + away_win[n], 1e-9)),
+                    "2": float(away_win[n] / max(home_win[n] + away_win[n], 1e-9))},
+            "dc": {"1X": float(home_win[n] + draw[n]), "X2": float(draw[n] + away_win[n]),
+                   "12": float(home_win[n] + away_win[n])},
+            "ah": handicaps,
+            "ah_main": main_line,
+        }
+    return results
+
+def market_rows(probs):
+    """Flat (market, pick, probability %) rows in the prompt's market names, for tables and prompt text."""
+    line = probs["ah_main"]
+    ah = probs["ah"][line]
+    return [
+        ("1X2 (Végeredmény)", "Hazai (1)", probs["1x2"]["1"]),
+        ("1X2 (Végeredmény)", "Döntetlen (X)", probs["1x2"]["X"]),
+        ("1X2 (Végeredmény)", "Vendég (2)", probs["1x2"]["2"]),
+        ("1.5 Gól Alatt/Felett", "Felett", probs["ou15"]["over"]),
+        ("1.5 Gól Alatt/Felett", "Alatt", probs["ou15"]["under"]),
+        ("2.5 Gól Alatt/Felett", "Felett", probs["ou25"]["over"]),
+        ("2.5 Gól Alatt/Felett", "Alatt", probs["ou25"]["under"]),
+        ("Mindkét Csapat Szerez Gólt", "Igen", probs["btts"]["yes"]),
+        ("Mindkét Csapat Szerez Gólt", "Nem", probs["btts"]["no"]),
+        ("Nincs Fogadás Döntetlenre", "Hazai", probs["dnb"]["1"]),
+        ("Nincs Fogadás Döntetlenre", "Vendég", probs["dnb"]["2"]),
+        ("Dupla Esély", "1X", probs["dc"]["1X"]),
+        ("Dupla Esély", "X2", probs["dc"]["X2"]),
+        ("Dupla Esély", "12", probs["dc"]["12"]),
+        (f"Ázsiai Hendikep {line:+.1f}", "Hazai", ah["home"]),
+        (f"Ázsiai Hendikep {line:+.1f}", "Vendég", ah["away"]),
+    ]
+
+def model_text(probs):
+    """The model's probabilities as a prompt block."""
+    lines = [f"POISSON MODEL (expected goals: home {probs['lambda_home']:.2f}, away {probs['lambda_away']:.2f}):"]
+    lines += [f"- {market}: {pick} {p * 100:.1f}%" for market, pick, p in market_rows(probs)]
+    return "\n".join(lines)
@@ -0,0 +1,136 @@
+import collections
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import pypdf
+from src.cache import get_cache
+
+# PDF text extraction for the scout reports. iter_pages() reads lazily, for callers that only need
+# as much text as fits in the prompt; pages of large PDFs are extracted a few chunks ahead in a process
+# pool (pypdf is pure Python, threads would serialize on the GIL). The per-page text is cached by the
+# SHA-256 of the file bytes, so re-uploading the same PDF costs nothing.
+
+CACHE_NAMESPACE = "pdf_pages"
+PARALLEL_MIN_PAGES = 8      # Smaller PDFs are faster to extract in-process than to ship to workers
+PDF_WORKERS = max(1, min(4, os.cpu_count() or 1))
+CHUNK_PAGES = 16            # Pages per worker task; at most PDF_WORKERS chunks are extracted ahead of the reader
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                # spawn, not fork: forking the multi-threaded server copies locks that may be held
+                _process_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+_worker_reader = {"digest": None, "reader": None}  # Per worker process: the last parsed document
+
+def _extract_range(data, digest, start, stop):
+    """Worker: text of pages [start, stop). Runs in a separate process, so it only gets bytes."""
+    if _worker_reader["digest"] != digest:
+        _worker_reader.update(digest=digest, reader=pypdf.PdfReader(io.BytesIO(data)))
+    reader = _worker_reader["reader"]
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def read_bytes(uploaded_file):
+    """Bytes of a Streamlit UploadedFile, an open binary file or raw bytes."""
+    if isinstance(uploaded_file, (bytes, bytearray)):
+        return bytes(uploaded_file)
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    return uploaded_file.read()
+
+def _cached_entry(digest):
+    """Cached pages of a file: {"page_count", "pages"}; pages may be a prefix if it was read lazily."""
+    entry = get_cache().get(CACHE_NAMESPACE, digest)
+    if isinstance(entry, list):  # Older entries held the complete page list only
+        return {"page_count": len(entry), "pages": entry}
+    return entry or {"page_count": None, "pages": []}
+
+def page_count(data):
+    """Number of pages, without extracting any text."""
+    entry = _cached_entry(file_hash(data))
+    if entry["page_count"] is not None:
+        return entry["page_count"]
+    return len(pypdf.PdfReader(io.BytesIO(data)).pages)
+
+def _parallel_pages(data, digest, start, stop):
+    """Yields the text of pages [start, stop) in order, keeping PDF_WORKERS chunks in flight ahead of the reader."""
+    pool = _get_process_pool()
+    starts = iter(range(start, stop, CHUNK_PAGES))
+    window = collections.deque()
+
+    def fill():
+        for chunk_start in itertools.islice(starts, PDF_WORKERS - len(window)):
+            window.append(pool.submit(_extract_range, data, digest, chunk_start, min(chunk_start + CHUNK_PAGES, stop)))
+
+    try:
+        fill()
+        while window:
+            chunk = window.popleft().result()
+            fill()
+            yield from chunk
+    finally:
+        for future in window:
+            future.cancel()
+
+def iter_pages(data):
+    """
+    Yields page texts one at a time, extracting only as far as the consumer reads.
+    Pages read so far are cached when the generator is closed, so a later call continues from there.
+    """
+    digest = file_hash(data)
+    entry = _cached_entry(digest)
+    pages = entry["pages"]
+    yield from list(pages)
+    if entry["page_count"] is not None and len(pages) >= entry["page_count"]:
+        return
+
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    count = len(reader.pages)
+    if count - len(pages) >= PARALLEL_MIN_PAGES and PDF_WORKERS > 1:
+        texts = _parallel_pages(data, digest, len(pages), count)
+    else:
+        texts = (reader.pages[i].extract_text() or "" for i in range(len(pages), count))
+    added = False
+    try:
+        for text in texts:
+            pages.append(text)
+            added = True
+            yield text
+    finally:
+        texts.close()
+        if added:
+            get_cache().set(CACHE_NAMESPACE, digest, {"page_count": count, "pages": pages})
+
+def iter_file_pages(files):
+    """
+    Yields (file_name, page_index, text) across several files, lazily and in order.
+    A file that cannot be read yields one error text in place of its remaining pages.
+    """
+    for uploaded_file in files:
+        name = getattr(uploaded_file, "name", None)
+        index = 0
+        pages = None
+        try:
+            pages = iter_pages(read_bytes(uploaded_file))
+            for text in pages:
+                yield name, index, text
+                index += 1
+        except Exception as e:
+            yield name, index, f"Error reading PDF: {str(e)}"
+        finally:
+            if pages is not None:
+                pages.close()
@@ -0,0 +1,82 @@
+import argparse
+import datetime
+import threading
+from src.config import PREFETCH_DAYS, PREFETCH_INTERVAL_MINUTES
+from src.rate_limiter import BACKGROUND
+from src.utils import fetch_active_leagues_and_matches, fetch_team_form, fetch_h2h, pair_key
+
+# Background warm-up of the persistent response cache: syncs fixtures for the next days in all
+# tracked leagues, then prefetches team form and H2H for every fixture that has not kicked off yet.
+# All requests run at BACKGROUND priority, so interactive users always go first.
+#
+#   python -m src.prefetch                 # one pass
+#   python -m src.prefetch --loop          # keep running every PREFETCH_INTERVAL_MINUTES
+
+NOT_STARTED_STATUSES = ("NS", "TBD")
+
+def prefetch_once(days=PREFETCH_DAYS, log=print):
+    """Runs one warm-up pass over today and the next `days` days. Returns a summary dict."""
+    summary = {"dates": 0, "fixtures": 0, "teams": 0, "pairs": 0}
+    today = datetime.date.today()
+    upcoming = []
+    for offset in range(days + 1):
+        date_str = (today + datetime.timedelta(days=offset)).isoformat()
+        organized = fetch_active_leagues_and_matches(date_str, priority=BACKGROUND)
+        summary["dates"] += 1
+        for matches in organized.values():
+            upcoming += [m for m in matches if m.get("status") in NOT_STARTED_STATUSES]
+
+    teams = {m["home_id"] for m in upcoming} | {m["away_id"] for m in upcoming}
+    pairs = {pair_key(m["home_id"], m["away_id"]): (m["home_id"], m["away_id"]) for m in upcoming}
+    summary.update(fixtures=len(upcoming), teams=len(teams), pairs=len(pairs))
+
+    # Sequential on purpose: the scheduler paces background work, there is no latency to hide here
+    for team_id in teams:
+        fetch_team_form(team_id, priority=BACKGROUND)
+    for home_id, away_id in pairs.values():
+        fetch_h2h(home_id, away_id, priority=BACKGROUND)
+
+    log(f"Prefetch done: {summary}")
+    return summary
+
+def _loop(days, interval_minutes, stop_event):
+    while not stop_event.is_set():
+        try:
+            prefetch_once(days)
+        except Exception as e:
+            print(f"Prefetch error: {e}")
+        stop_event.wait(interval_minutes * 60)
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def start_background_prefetch(days=PREFETCH_DAYS, interval_minutes=PREFETCH_INTERVAL_MINUTES):
+    """Starts the in-app prefetch thread once per process; later calls are no-ops. Returns the thread."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            stop_event = threading.Event()
+            _worker = threading.Thread(
+                target=_loop, args=(days, interval_minutes, stop_event), name="prefetch", daemon=True
+            )
+            _worker.stop_event = stop_event
+            _worker.start()
+    return _worker
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Warm the RapidAPI cache for upcoming fixtures.")
+    parser.add_argument("--days", type=int, default=PREFETCH_DAYS, help="days ahead to sync (besides today)")
+    parser.add_argument("--loop", action="store_true", help="keep running")
+    parser.add_argument("--interval", type=int, default=PREFETCH_INTERVAL_MINUTES, help="minutes between passes")
+    args = parser.parse_args()
+
+    if args.loop:
+        _loop(args.days, args.interval, threading.Event())
+    else:
+        prefetch_once(args.days)
+
+if __name__ == "__main__":
+    main()
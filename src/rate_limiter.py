@@ -0,0 +1,185 @@
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Central scheduler for RapidAPI calls: a token bucket for the per-minute quota, a counter for the
+# daily quota, single-flight coalescing of identical in-flight requests, and priority for
+# interactive requests over background prefetch.
+
+PER_MINUTE = int(os.getenv("RAPIDAPI_PER_MINUTE", "30"))
+PER_DAY = int(os.getenv("RAPIDAPI_PER_DAY", "7500"))
+# Share of each quota that background work may not touch, so clicks in the UI still go through
+BACKGROUND_RESERVE = float(os.getenv("RAPIDAPI_BACKGROUND_RESERVE", "0.2"))
+
+INTERACTIVE = 0
+BACKGROUND = 1
+MAX_WAIT = {INTERACTIVE: 10.0, BACKGROUND: 300.0}
+
+class QuotaExceeded(Exception):
+    """No quota became available within the priority's maximum wait."""
+
+class RequestScheduler:
+    def __init__(self, per_minute=PER_MINUTE, per_day=PER_DAY, reserve=BACKGROUND_RESERVE):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.reserve = reserve
+        self._cond = threading.Condition()
+        self._tokens = float(per_minute)
+        self._refilled_at = time.monotonic()
+        self._day = datetime.datetime.now(datetime.timezone.utc).date()  # API-Football resets daily quotas at 00:00 UTC
+        self._used_today = 0
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._inflight = {}
+        self._server = {}
+        self._counters = {"sent": 0, "coalesced": 0, "rejected": 0}
+
+    # --- Quota ---
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.per_minute, self._tokens + (now - self._refilled_at) * self.per_minute / 60.0)
+        self._refilled_at = now
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        if today != self._day:
+            self._day, self._used_today = today, 0
+
+    def _in_daily_reserve(self):
+        return self.per_day - self._used_today < 1 + self.reserve * self.per_day
+
+    def _can_send(self, priority):
+        daily_left = self.per_day - self._used_today
+        if priority == INTERACTIVE:
+            return self._tokens >= 1 and daily_left >= 1
+        # Background waits for interactive callers and leaves the reserve untouched
+        return (self._waiting[INTERACTIVE] == 0
+                and self._tokens >= 1 + self.reserve * self.per_minute
+                and not self._in_daily_reserve())
+
+    def _acquire(self, ticket):
+        """
+        Waits for quota for one request. ticket = {"priority": ...} may be promoted by _promote()
+        while waiting (a more urgent caller joined the request); it then waits under the new priority's rules.
+        """
+        with self._cond:
+            ticket["deadline"] = time.monotonic() + MAX_WAIT[ticket["priority"]]
+            ticket["waiting"] = True
+            self._waiting[ticket["priority"]] += 1
+            try:
+                while True:
+                    self._refill()
+                    priority = ticket["priority"]
+                    if self._can_send(priority):
+                        self._tokens -= 1
+                        self._used_today += 1
+                        self._counters["sent"] += 1
+                        return
+                    remaining = ticket["deadline"] - time.monotonic()
+                    # The daily quota only resets at midnight UTC: background work inside the reserve gives up at once
+                    if (remaining <= 0 or self._used_today >= self.per_day
+                            or (priority == BACKGROUND and self._in_daily_reserve())):
+                        self._counters["rejected"] += 1
+                        ticket["rejected_as"] = priority
+                        raise QuotaExceeded("RapidAPI quota exhausted")
+                    # Sleep until roughly one token has been refilled
+                    self._cond.wait(min(remaining, 60.0 / max(self.per_minute, 1)))
+            finally:
+                ticket["waiting"] = False
+                self._waiting[ticket["priority"]] -= 1
+                self._cond.notify_all()
+
+    def _promote(self, ticket, priority):
+        """Raises a queued request to a more urgent priority (call with self._cond held)."""
+        if priority >= ticket["priority"]:
+            return
+        if ticket.get("waiting"):
+            self._waiting[ticket["priority"]] -= 1
+            self._waiting[priority] += 1
+            ticket["deadline"] = min(ticket["deadline"], time.monotonic() + MAX_WAIT[priority])
+        ticket["priority"] = priority
+        self._cond.notify_all()
+
+    def update_from_headers(self, headers):
+        """Syncs with the quota the server reports (API-Football / RapidAPI rate limit headers)."""
+        mapping = {
+            "x-ratelimit-requests-remaining": "day_remaining",
+            "x-ratelimit-requests-limit": "day_limit",
+            "x-ratelimit-remaining": "minute_remaining",
+            "x-ratelimit-limit": "minute_limit",
+        }
+        with self._cond:
+            for header, name in mapping.items():
+                value = headers.get(header)
+                if value is not None and str(value).isdigit():
+                    self._server[name] = int(value)
+            # Trust the server if it says we have less left than we think
+            if "day_remaining" in self._server:
+                self._used_today = max(self._used_today, self.per_day - self._server["day_remaining"])
+            if "minute_remaining" in self._server:
+                self._refill()
+                self._tokens = min(self._tokens, float(self._server["minute_remaining"]))
+
+    # --- Scheduling ---
+
+    def run(self, key, fn, priority=INTERACTIVE):
+        """
+        Runs fn() once quota allows. Concurrent calls with the same key share one request:
+        followers wait for the leader's result instead of spending quota. A more urgent follower
+        promotes the shared request to its own priority.
+        """
+        with self._cond:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                self._counters["coalesced"] += 1
+                future, ticket = entry
+                promoted = priority < ticket["priority"]
+                self._promote(ticket, priority)
+                leader = False
+            else:
+                future, ticket = Future(), {"priority": priority}
+                self._inflight[key] = (future, ticket)
+                leader = True
+
+        if not leader:
+            try:
+                return future.result()
+            except QuotaExceeded:
+                # The leader gave up under its own, stricter rules before the promotion reached it
+                if promoted and ticket.get("rejected_as", priority) > priority:
+                    return self.run(key, fn, priority)
+                raise
+
+        try:
+            self._acquire(ticket)
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop(key, None)
+
+    def status(self):
+        """Remaining-quota telemetry for the UI."""
+        with self._cond:
+            self._refill()
+            return {
+                "minute_remaining": int(self._tokens),
+                "minute_limit": self.per_minute,
+                "day_remaining": self.per_day - self._used_today,
+                "day_limit": self.per_day,
+                "server": dict(self._server),
+                "waiting": dict(self._waiting),
+                "inflight": len(self._inflight),
+                **self._counters,
+            }
+
+    def is_low(self):
+        """True when interactive requests are about to be throttled (UI should prefer cached data)."""
+        status = self.status()
+        return status["minute_remaining"] < 1 or status["day_remaining"] < max(1, self.reserve * self.per_day)
+
+scheduler = RequestScheduler()
@@ -0,0 +1,135 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from src.config import MARKET_KEYWORDS
+
+# Local relevance ranking of the scout-report text: the PDF text is split into chunks, scored with
+# BM25 against the match's team names and the required markets, and the best chunks are packed
+# into the prompt budget (in their original order), instead of blindly keeping the first N chars.
+
+CHUNK_CHARS = 800
+STEM_LENGTH = 6  # Crude stemming for Hungarian suffixes: "Arsenalnak" and "Arsenal" share a prefix
+BM25_K1 = 1.5
+BM25_B = 0.75
+TEAM_WEIGHT = 3.0
+CHUNK_SEPARATOR = "\n[...]\n"
+
+# Terms that mark useful context for any match (injuries, suspensions, form, goals, lineups)
+CONTEXT_TERMS = (
+    "sérült", "sérülés", "hiányzik", "hiányzó", "eltiltás", "eltiltott", "kérdéses",
+    "injury", "injured", "suspended", "suspension", "doubtful",
+    "forma", "form", "gól", "goals", "xg", "kezdő", "lineup", "motiváció", "motivation",
+    "hazai", "vendég", "home", "away", "szöglet", "corners",
+)
+FILE_HEADER = re.compile(r"^--- FILE: (.*) ---$")
+
+def _fold(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def tokenize(text):
+    return [token[:STEM_LENGTH] for token in re.findall(r"\w+", _fold(text)) if len(token) > 1]
+
+def _split_line(line, chunk_chars):
+    """A line cut into pieces of at most chunk_chars, at whitespace where possible (pages often extract as one line)."""
+    while len(line) > chunk_chars:
+        cut = line.rfind(" ", 0, chunk_chars + 1)
+        if cut <= 0:
+            cut = chunk_chars
+        yield line[:cut]
+        line = line[cut:].lstrip()
+    if line:
+        yield line
+
+def split_chunks(text, chunk_chars=CHUNK_CHARS):
+    """
+    Splits the extracted text into ~chunk_chars chunks on line boundaries (longer lines are split at
+    whitespace). Returns [(file_name, chunk)].
+    """
+    chunks, lines, size, file_name = [], [], 0, None
+
+    def flush():
+        if lines:
+            chunks.append((file_name, "\n".join(lines)))
+            lines.clear()
+
+    for line in text.splitlines():
+        header = FILE_HEADER.match(line.strip())
+        if header:
+            flush()
+            size, file_name = 0, header.group(1)
+            continue
+        if not line.strip():
+            continue
+        for piece in _split_line(line, chunk_chars):
+            if size + len(piece) > chunk_chars and lines:
+                flush()
+                size = 0
+            lines.append(piece)
+            size += len(piece) + 1
+    flush()
+    return chunks
+
+def build_query(match_name=None, markets=None):
+    """Weighted query terms: team names count more than market and general context terms."""
+    query = Counter()
+    for team in re.split(r"\s+vs\.?\s+", match_name or "", flags=re.IGNORECASE):
+        for token in tokenize(team):
+            query[token] = TEAM_WEIGHT
+    keywords = [kw for kws, _ in MARKET_KEYWORDS for kw in kws] + list(markets or []) + list(CONTEXT_TERMS)
+    for keyword in keywords:
+        for token in tokenize(keyword):
+            query[token] = max(query[token], 1.0)
+    return query
+
+def bm25_scores(documents, query):
+    """BM25 score of every tokenized document against a {term: weight} query."""
+    if not documents:
+        return []
+    avg_len = sum(len(d) for d in documents) / len(documents) or 1.0
+    df = Counter(term for d in documents for term in set(d) if term in query)
+    n = len(documents)
+    idf = {term: math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5)) for term in df}
+    scores = []
+    for d in documents:
+        tf = Counter(d)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(d) / avg_len)
+        scores.append(sum(
+            weight * idf[term] * tf[term] * (BM25_K1 + 1) / (tf[term] + norm)
+            for term, weight in query.items() if tf.get(term)
+        ))
+    return scores
+
+def select_context(text, match_name=None, markets=None, budget=None, size=len):
+    """
+    Returns the most relevant chunks of text that fit in the budget, in document order.
+    size measures a piece of text in budget units (characters by default).
+    Text that already fits is returned unchanged.
+    """
+    if budget is None or size(text) <= budget:
+        return text
+
+    chunks = split_chunks(text)
+    scores = bm25_scores([tokenize(chunk) for _, chunk in chunks], build_query(match_name, markets))
+    # Best first; chunks without any matching term keep document order, so they only fill leftover room
+    ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+
+    chosen, used = [], 0
+    for i in ranked:
+        file_name, chunk = chunks[i]
+        cost = size(chunk) + size(CHUNK_SEPARATOR) + (size(f"--- FILE: {file_name} ---\n") if file_name else 0)
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+
+    parts, current_file = [], None
+    for i in sorted(chosen):
+        file_name, chunk = chunks[i]
+        if file_name != current_file:
+            parts.append(f"\n--- FILE: {file_name} ---\n" if file_name else "\n")
+            current_file = file_name
+        elif parts:
+            parts.append(CHUNK_SEPARATOR)
+        parts.append(chunk)
+    return "".join(parts) + "\n"
@@ -1,101 +1,562 @@
+import gzip
+import hashlib
 import json
 import os
+import sqlite3
+import threading
 import uuid
+from src.analytics import apply_tip, derive, ensure_schema as ensure_analytics_schema
+from src.journal import GroupCommitter, Journal
 
-DATA_FILE = "data/saved_tips.json"
-ANALYSIS_FILE = "data/saved_analyses.json"
+DATA_FILE = "data/saved_tips.json"  # Legacy tip store, only read by the migrator
+TIPS_DB = "data/saved_tips.db"
+ANALYSIS_FILE = "data/saved_analyses.json"  # Legacy single-file analysis store, only read by the migrator
+ANALYSIS_INDEX_FILE = "data/analysis_index.json"
+ANALYSIS_BODY_DIR = "data/analyses"
 
-def load_tips():
-    """Loads tips from the JSON file."""
-    if not os.path.exists(DATA_FILE):
+# Tip fields that get their own (indexed) column. Everything else lives in the JSON "data" column,
+# except "summary", which is shared by all tips of one analysis and stored once in the summaries table.
+TIP_COLUMNS = ("id", "match", "date", "market", "status")
+ROW_FIELDS = TIP_COLUMNS + ("summary_id", "data")
+
+# Analysis fields kept in the index; the full record lives in its own gzip blob
+ANALYSIS_INDEX_FIELDS = ("id", "match_name", "date", "timestamp")
+
+_local = threading.local()
+_schema_ready = set()
+
+# Process-wide cache of parsed tips (id -> tip, insertion ordered), valid for one DB version.
+# Every write transaction bumps meta.version, so other processes' writes invalidate it too.
+_tips_cache = {"db": None, "version": None, "tips": {}}
+_tips_cache_lock = threading.Lock()
+
+# --- TIP STORAGE (SQLite) ---
+
+def _ensure_schema(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS tips (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            match TEXT,
+            date TEXT,
+            market TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tips_status ON tips(status);
+        CREATE INDEX IF NOT EXISTS idx_tips_date ON tips(date);
+        CREATE INDEX IF NOT EXISTS idx_tips_match ON tips(match);
+        CREATE TABLE IF NOT EXISTS summaries (
+            id TEXT PRIMARY KEY,
+            text TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+        -- Lessons index: lost tips keyed by team, see lesson_keys()
+        CREATE TABLE IF NOT EXISTS lessons (
+            tip_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            seq INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_lessons_key ON lessons(key, seq);
+        CREATE INDEX IF NOT EXISTS idx_lessons_tip ON lessons(tip_id);
+        CREATE INDEX IF NOT EXISTS idx_tips_lost ON tips(seq) WHERE status = 'lost';
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('lessons_version', 0);
+    """)
+    # Databases created before summaries were normalized
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(tips)")]
+    if "summary_id" not in columns:
+        conn.execute("ALTER TABLE tips ADD COLUMN summary_id TEXT")
+        conn.commit()
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tips_summary ON tips(summary_id)")
+    ensure_analytics_schema(conn)
+
+def _bump_version(conn, key="version"):
+    """Increments a meta counter inside the current write transaction; returns the new value."""
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (key,))
+    return conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+
+def _get_conn():
+    """Returns this thread's connection to the tip database (Streamlit runs sessions in threads)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "db_path", None) == TIPS_DB:
+        return conn
+
+    os.makedirs(os.path.dirname(TIPS_DB), exist_ok=True)
+    # IMMEDIATE: take the write lock when a transaction starts, so concurrent writers queue on busy_timeout
+    conn = sqlite3.connect(TIPS_DB, timeout=30, isolation_level="IMMEDIATE")
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers run alongside the (single) writer of other processes
+    conn.execute("PRAGMA journal_mode=WAL")
+    _local.conn = conn
+    _local.db_path = TIPS_DB
+
+    if TIPS_DB not in _schema_ready:
+        _ensure_schema(conn)
+        _schema_ready.add(TIPS_DB)
+        # One-shot migrations on first use
+        if os.path.exists(DATA_FILE):
+            migrate_tips_from_json(DATA_FILE)
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'summaries_normalized'").fetchone():
+            normalize_tip_summaries()
+        indexed = conn.execute("SELECT value FROM meta WHERE key = 'lessons_indexed'").fetchone()
+        if not indexed or indexed[0] < LESSONS_INDEX_VERSION:
+            rebuild_lessons_index()
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'tip_stats_built'").fetchone():
+            rebuild_tip_stats()
+    return conn
+
+def _compact_json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _summary_id(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+def _tip_to_row(tip):
+    """Returns (row tuple in ROW_FIELDS order, summary text or None)."""
+    extra = {k: v for k, v in tip.items() if k not in TIP_COLUMNS and k != "summary"}
+    summary = tip.get("summary") or None
+    return ((tip["id"], tip.get("match"), tip.get("date"), tip.get("market"), tip["status"],
+             _summary_id(summary) if summary else None, _compact_json(extra)), summary)
+
+def _row_to_tip(row, summary=None):
+    tip = {"id": row["id"], "match": row["match"], "date": row["date"], "market": row["market"]}
+    tip.update(json.loads(row["data"]))
+    if summary:
+        tip["summary"] = summary
+    tip["status"] = row["status"]
+    return tip
+
+# Tips joined with their shared summary text
+ID_CHUNK = 500  # Ids per IN (...) lookup
+
+TIP_SELECT = "SELECT t.*, s.text AS summary FROM tips t LEFT JOIN summaries s ON s.id = t.summary_id"
+
+def _insert_tips(conn, tips, ignore=False):
+    """Inserts tips and their (deduplicated) summaries; returns the tips as load_tips() would return them."""
+    if ignore:
+        # Only tips that are actually new count towards the analytics.
+        # Looked up in chunks: SQLite builds may allow as few as 32766 (or 999) parameters per statement
+        ids, existing = [t["id"] for t in tips], set()
+        for i in range(0, len(ids), ID_CHUNK):
+            chunk = ids[i:i + ID_CHUNK]
+            existing.update(r["id"] for r in conn.execute(
+                f"SELECT id FROM tips WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        counted = []
+        for t in tips:
+            if t["id"] not in existing:  # INSERT OR IGNORE also keeps only the first of repeated ids
+                existing.add(t["id"])
+                counted.append(t)
+    else:
+        counted = tips
+    rows = [_tip_to_row(t) for t in tips]
+    conn.executemany(
+        "INSERT OR IGNORE INTO summaries (id, text) VALUES (?, ?)",
+        [(row[5], summary) for row, summary in rows if summary]
+    )
+    conn.executemany(
+        f"INSERT {'OR IGNORE ' if ignore else ''}INTO tips (id, match, date, market, status, summary_id, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [row for row, _ in rows]
+    )
+    for tip in counted:
+        apply_tip(conn, tip, tip["status"])
+    lost = [t["id"] for t in tips if t["status"] == "lost"]
+    for tip_id in lost:
+        _index_lesson(conn, tip_id)
+    if lost:
+        _bump_version(conn, "lessons_version")
+    return [_row_to_tip(dict(zip(ROW_FIELDS, row)), summary) for row, summary in rows]
+
+def _drop_orphan_summary(conn, summary_id):
+    if summary_id:
+        conn.execute(
+            "DELETE FROM summaries WHERE id = ? AND NOT EXISTS (SELECT 1 FROM tips WHERE summary_id = ?)",
+            (summary_id, summary_id)
+        )
+
+# --- LESSONS INDEX (lost tips) ---
+
+# Relevance is by team only: every analysis asks for all markets, so market keys would not rank anything.
+# Version 2 dropped the market keys of version 1; older indexes are rebuilt on first use.
+LESSONS_INDEX_VERSION = 2
+
+def lesson_keys(match):
+    """Index keys for a match ("Home vs Away"): team:<name> per team."""
+    keys = []
+    for team in (match or "").split(" vs "):
+        if team.strip():
+            keys.append(f"team:{team.strip().lower()}")
+    return keys
+
+def _index_lesson(conn, tip_id):
+    conn.execute("DELETE FROM lessons WHERE tip_id = ?", (tip_id,))
+    row = conn.execute("SELECT seq, match FROM tips WHERE id = ?", (tip_id,)).fetchone()
+    if row:
+        conn.executemany(
+            "INSERT INTO lessons (tip_id, key, seq) VALUES (?, ?, ?)",
+            [(tip_id, key, row["seq"]) for key in lesson_keys(row["match"])]
+        )
+
+def rebuild_lessons_index():
+    """Rebuilds the lessons index from all lost tips (one-shot backfill, also usable for repair)."""
+    conn = _get_conn()
+    with conn:
+        conn.execute("DELETE FROM lessons")
+        for row in conn.execute("SELECT id FROM tips WHERE status = 'lost'").fetchall():
+            _index_lesson(conn, row["id"])
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('lessons_indexed', ?)", (LESSONS_INDEX_VERSION,))
+        _bump_version(conn, "lessons_version")
+
+# --- PERFORMANCE ANALYTICS (see src/analytics.py) ---
+
+def _analytics_tip(row):
+    """The fields analytics needs from a tips row (market column plus the JSON extras)."""
+    return dict(json.loads(row["data"]), market=row["market"])
+
+def rebuild_tip_stats():
+    """Recomputes the analytics counters from all tips (one-shot backfill, also usable for repair)."""
+    conn = _get_conn()
+    with conn:
+        conn.execute("DELETE FROM tip_stats")
+        for row in conn.execute("SELECT status, market, data FROM tips").fetchall():
+            apply_tip(conn, _analytics_tip(row), row["status"])
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tip_stats_built', 1)")
+
+def get_tip_stats(dimension=None):
+    """
+    The materialized performance counters with hit rate, ROI and average confidence,
+    optionally for one dimension ("all", "market", "league", "confidence").
+    Reads one row per dimension key, independent of the tip history size.
+    """
+    sql, params = "SELECT * FROM tip_stats WHERE tips > 0", []
+    if dimension:
+        sql += " AND dimension = ?"
+        params.append(dimension)
+    rows = _get_conn().execute(sql + " ORDER BY dimension, key", params).fetchall()
+    return [derive(dict(r)) for r in rows]
+
+def lessons_version():
+    """Counter that changes whenever the set of lost tips changes."""
+    return _get_conn().execute("SELECT value FROM meta WHERE key = 'lessons_version'").fetchone()[0]
+
+def get_lost_tips(keys=None, limit=5):
+    """
+    Returns up to `limit` lost tips, newest first, from the lessons index.
+    Tips matching more of `keys` (see lesson_keys) rank first; the rest is filled with the latest lost tips.
+    Cost depends on the number of matching lessons and `limit`, not on the tip history.
+    """
+    conn = _get_conn()
+    keys = list(keys or [])
+    ids = []
+    if keys:
+        placeholders = ", ".join("?" * len(keys))
+        ids = [r["tip_id"] for r in conn.execute(
+            f"SELECT tip_id, COUNT(*) AS hits, MAX(seq) AS seq FROM lessons WHERE key IN ({placeholders}) "
+            "GROUP BY tip_id ORDER BY hits DESC, seq DESC LIMIT ?",
+            keys + [limit]
+        )]
+    if len(ids) < limit:
+        for r in conn.execute("SELECT id FROM tips WHERE status = 'lost' ORDER BY seq DESC LIMIT ?", (limit,)):
+            if r["id"] not in ids and len(ids) < limit:
+                ids.append(r["id"])
+    if not ids:
         return []
+
+    rows = conn.execute(f"{TIP_SELECT} WHERE t.id IN ({', '.join('?' * len(ids))})", ids).fetchall()
+    by_id = {r["id"]: _row_to_tip(r, r["summary"]) for r in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+def normalize_tip_summaries():
+    """
+    One-shot migration: moves summaries embedded in tip rows into the shared summaries table
+    and re-encodes every row compactly, then VACUUMs to give the space back.
+    Returns the number of rewritten tips.
+    """
+    conn = _get_conn()
+    with conn:
+        rows = conn.execute("SELECT id, data FROM tips").fetchall()
+        updates, summaries = [], {}
+        for r in rows:
+            extra = json.loads(r["data"])
+            summary = extra.pop("summary", None) or None
+            summary_id = None
+            if summary:
+                summary_id = _summary_id(summary)
+                summaries[summary_id] = summary
+                updates.append((summary_id, _compact_json(extra), r["id"]))
+            else:
+                updates.append((None, _compact_json(extra), r["id"]))
+        conn.executemany("INSERT OR IGNORE INTO summaries (id, text) VALUES (?, ?)", summaries.items())
+        # COALESCE keeps summary_ids of rows written by an already-normalized writer
+        conn.executemany(
+            "UPDATE tips SET summary_id = COALESCE(?, summary_id), data = ? WHERE id = ?", updates
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('summaries_normalized', 1)")
+        _bump_version(conn)
+    conn.execute("VACUUM")
+    return len(updates)
+
+def migrate_tips_from_json(json_path=DATA_FILE):
+    """
+    Imports tips from the legacy JSON file into the SQLite store.
+    Tips whose ID already exists are skipped, so it is safe to re-run.
+    The JSON file is renamed to *.migrated afterwards. Returns the number of imported tips.
+    """
+    if not os.path.exists(json_path):
+        return 0
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+        with open(json_path, "r", encoding="utf-8") as f:
+            tips = json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError) as e:
+        print(f"Tip migration skipped, unreadable JSON: {e}")
+        return 0
+
+    for tip in tips:
+        tip.setdefault("id", str(uuid.uuid4()))
+        tip.setdefault("status", "pending")
+
+    conn = _get_conn()
+    with conn:
+        before = conn.execute("SELECT COUNT(*) FROM tips").fetchone()[0]
+        _insert_tips(conn, tips, ignore=True)
+        imported = conn.execute("SELECT COUNT(*) FROM tips").fetchone()[0] - before
+        _bump_version(conn)
+
+    os.replace(json_path, json_path + ".migrated")
+    return imported
+
+def load_tips():
+    """
+    Loads all tips in insertion order.
+    Served from the process-wide cache while the DB version is unchanged; treat the dicts as read-only.
+    """
+    conn = _get_conn()
+    conn.execute("BEGIN")  # One read snapshot for the version and the rows
+    try:
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        with _tips_cache_lock:
+            if _tips_cache["db"] == TIPS_DB and _tips_cache["version"] == version:
+                return list(_tips_cache["tips"].values())
+        rows = conn.execute(f"{TIP_SELECT} ORDER BY t.seq").fetchall()
+    finally:
+        conn.rollback()
+
+    tips = {r["id"]: _row_to_tip(r, r["summary"]) for r in rows}
+    with _tips_cache_lock:
+        _tips_cache.update(db=TIPS_DB, version=version, tips=tips)
+    return list(tips.values())
+
+def query_tips(status=None, date_from=None, date_to=None, market=None, offset=0, limit=20):
+    """
+    Returns one page of tips plus the total match count: (tips, total).
+    Ordered like the Tipptörténet page: pending first, then by date and match.
+    Filters: exact status, inclusive YYYY-MM-DD date range, substring match on market.
+    """
+    where, params = [], []
+    if status:
+        where.append("t.status = ?")
+        params.append(status)
+    if date_from:
+        where.append("t.date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        where.append("t.date <= ?")
+        params.append(str(date_to))
+    if market:
+        where.append("t.market LIKE ?")
+        params.append(f"%{market}%")
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    conn = _get_conn()
+    total = conn.execute(f"SELECT COUNT(*) FROM tips t {where_sql}", params).fetchone()[0]
+    rows = conn.execute(
+        f"{TIP_SELECT} {where_sql} ORDER BY t.status != 'pending', t.date, t.match, t.seq LIMIT ? OFFSET ?",
+        params + [limit, offset]
+    ).fetchall()
+    return [_row_to_tip(r, r["summary"]) for r in rows], total
+
+def _patch_tips_cache(ops, results, old_version, new_version):
+    """Applies a committed batch to the cache, if the cache was current right before it."""
+    with _tips_cache_lock:
+        if _tips_cache["db"] != TIPS_DB or _tips_cache["version"] != old_version:
+            return
+        cached = _tips_cache["tips"]
+        for op, result in zip(ops, results):
+            if op[0] == "insert":
+                for tip in result:
+                    cached[tip["id"]] = tip
+            elif op[0] == "status" and result:
+                cached[op[1]] = dict(cached[op[1]], status=op[2])
+            elif op[0] == "delete":
+                cached.pop(op[1], None)
+        _tips_cache["version"] = new_version
+
+def _apply_tip_ops(ops):
+    """Applies a batch of queued tip writes in a single transaction (one fsync for all sessions)."""
+    conn = _get_conn()
+    results = []
+    with conn:
+        new_version = _bump_version(conn)
+        for op in ops:
+            if op[0] == "insert":
+                results.append(_insert_tips(conn, op[1]))
+            elif op[0] == "status":
+                row = conn.execute("SELECT status, market, data FROM tips WHERE id = ?", (op[1],)).fetchone()
+                conn.execute("UPDATE tips SET status = ? WHERE id = ?", (op[2], op[1]))
+                if row and row["status"] != op[2]:
+                    tip = _analytics_tip(row)
+                    apply_tip(conn, tip, row["status"], -1)
+                    apply_tip(conn, tip, op[2])
+                # Keep the lessons index in step with the set of lost tips
+                if row and "lost" in (row["status"], op[2]) and row["status"] != op[2]:
+                    if op[2] == "lost":
+                        _index_lesson(conn, op[1])
+                    else:
+                        conn.execute("DELETE FROM lessons WHERE tip_id = ?", (op[1],))
+                    _bump_version(conn, "lessons_version")
+                results.append(row is not None)
+            elif op[0] == "delete":
+                row = conn.execute("SELECT summary_id, status, market, data FROM tips WHERE id = ?", (op[1],)).fetchone()
+                conn.execute("DELETE FROM tips WHERE id = ?", (op[1],))
+                if row:
+                    _drop_orphan_summary(conn, row["summary_id"])
+                    apply_tip(conn, _analytics_tip(row), row["status"], -1)
+                    if row["status"] == "lost":
+                        conn.execute("DELETE FROM lessons WHERE tip_id = ?", (op[1],))
+                        _bump_version(conn, "lessons_version")
+                results.append(None)
+    _patch_tips_cache(ops, results, new_version - 1, new_version)
+    return results
+
+_tip_writes = GroupCommitter(_apply_tip_ops)
 
 def save_tip(tip_data):
-    """Saves a single tip or list of tips to the JSON file."""
-    tips = load_tips()
-    
+    """Saves a single tip or list of tips."""
     # Ensure tip_data is a list
     if not isinstance(tip_data, list):
         new_tips = [tip_data]
     else:
         new_tips = tip_data
-        
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-        
+
     # Add UUID and default status if missing
     for tip in new_tips:
         if "id" not in tip:
             tip["id"] = str(uuid.uuid4())
         if "status" not in tip:
             tip["status"] = "pending"
-            
-    tips.extend(new_tips)
-    
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(tips, f, indent=4, ensure_ascii=False)
+
+    _tip_writes.submit(("insert", new_tips))
 
 def update_tip_status(tip_id, new_status):
     """Updates the status of a tip (won/lost/pending)."""
-    tips = load_tips()
-    updated = False
-    for tip in tips:
-        if tip["id"] == tip_id:
-            tip["status"] = new_status
-            updated = True
-            break
-            
-    if updated:
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(tips, f, indent=4, ensure_ascii=False)
-    return updated
+    return _tip_writes.submit(("status", tip_id, new_status))
 
 def delete_tip(tip_id):
     """Deletes a tip by ID."""
-    tips = load_tips()
-    tips = [t for t in tips if t["id"] != tip_id]
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(tips, f, indent=4, ensure_ascii=False)
+    _tip_writes.submit(("delete", tip_id))
 
 # --- ANALYSIS STORAGE ---
+# Lightweight index (snapshot + append-only journal, see src/journal.py) of ANALYSIS_INDEX_FIELDS,
+# plus one gzip-compressed JSON body per analysis in ANALYSIS_BODY_DIR, read only on demand.
+
+_analysis_journal = Journal(ANALYSIS_INDEX_FILE)
+_analysis_migration_checked = False
+_analysis_migration_lock = threading.Lock()
+
+def _body_path(analysis_id):
+    return os.path.join(ANALYSIS_BODY_DIR, f"{analysis_id}.json.gz")
+
+def _write_body(analysis_data):
+    os.makedirs(ANALYSIS_BODY_DIR, exist_ok=True)
+    path = _body_path(analysis_data["id"])
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        f.write(_compact_json(analysis_data))
+    os.replace(tmp_path, path)
+
+def _index_entry(analysis_data):
+    return {k: analysis_data.get(k) for k in ANALYSIS_INDEX_FIELDS}
+
+def migrate_analyses_to_index(json_path=ANALYSIS_FILE):
+    """
+    Splits the legacy saved_analyses.json (and its journal) into index entries + compressed bodies.
+    The legacy files are renamed to *.migrated afterwards. Returns the number of migrated analyses.
+    """
+    legacy = Journal(json_path)
+    analyses = legacy.load()
+    for analysis in analyses:
+        analysis.setdefault("id", str(uuid.uuid4()))
+        _write_body(analysis)
+        _analysis_journal.put(_index_entry(analysis))
+
+    for path in (legacy.snapshot_path, legacy.journal_path):
+        try:
+            os.replace(path, path + ".migrated")
+        except FileNotFoundError:
+            pass
+    return len(analyses)
+
+def _ensure_analysis_migration():
+    global _analysis_migration_checked
+    if _analysis_migration_checked:
+        return
+    with _analysis_migration_lock:
+        if not _analysis_migration_checked:
+            if os.path.exists(ANALYSIS_FILE):
+                migrate_analyses_to_index(ANALYSIS_FILE)
+            _analysis_migration_checked = True
 
 def load_analyses():
-    """Loads saved analyses from the JSON file."""
-    if not os.path.exists(ANALYSIS_FILE):
-        return []
+    """Loads the index of saved analyses (id, match_name, date, timestamp) without their bodies."""
+    _ensure_analysis_migration()
+    return _analysis_journal.load()
+
+def load_analysis(analysis_id):
+    """Loads one full analysis record (including full_result), or None if it is missing."""
     try:
-        with open(ANALYSIS_FILE, "r", encoding="utf-8") as f:
+        with gzip.open(_body_path(analysis_id), "rt", encoding="utf-8") as f:
             return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+    except (FileNotFoundError, OSError, json.JSONDecodeError):
+        return None
+
+def query_analyses(match=None, date_from=None, date_to=None, offset=0, limit=10):
+    """
+    Returns one page of analysis index entries, newest first, plus the total match count: (analyses, total).
+    Filters: case-insensitive substring on match_name, inclusive YYYY-MM-DD range on the match date.
+    Use load_analysis(id) for the full record.
+    """
+    analyses = load_analyses()
+    if match:
+        needle = match.lower()
+        analyses = [a for a in analyses if needle in (a.get("match_name") or "").lower()]
+    if date_from:
+        analyses = [a for a in analyses if (a.get("date") or "") >= str(date_from)]
+    if date_to:
+        analyses = [a for a in analyses if (a.get("date") or "") <= str(date_to)]
+    analyses.reverse()
+    return analyses[offset:offset + limit], len(analyses)
 
 def save_analysis(analysis_data):
     """Saves a full analysis report."""
-    analyses = load_analyses()
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(ANALYSIS_FILE), exist_ok=True)
-    
+    _ensure_analysis_migration()
     if "id" not in analysis_data:
         analysis_data["id"] = str(uuid.uuid4())
-    
-    # Check if analysis for this match already exists, update if so (optional, but good for idempotency)
-    # For now, we just append a new one or replace if ID exists
-    
-    analyses.append(analysis_data)
-    
-    with open(ANALYSIS_FILE, "w", encoding="utf-8") as f:
-        json.dump(analyses, f, indent=4, ensure_ascii=False)
+
+    # Body first, so an index entry never points at a missing blob.
+    # Re-saving an existing ID replaces that analysis.
+    _write_body(analysis_data)
+    _analysis_journal.put(_index_entry(analysis_data))
 
 def delete_analysis(analysis_id):
     """Deletes an analysis by ID."""
-    analyses = load_analyses()
-    analyses = [a for a in analyses if a.get("id") != analysis_id]
-    with open(ANALYSIS_FILE, "w", encoding="utf-8") as f:
-        json.dump(analyses, f, indent=4, ensure_ascii=False)
-
+    _ensure_analysis_migration()
+    _analysis_journal.delete(analysis_id)
+    try:
+        os.remove(_body_path(analysis_id))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,73 @@
+import json
+
+# Incremental parser for a JSON object that arrives in chunks (streamed GPT output).
+# It reports top-level string fields and the elements of top-level arrays as soon as each one is
+# complete, without waiting for (or re-parsing) the whole document.
+
+class IncrementalJSONParser:
+    """
+    feed(chunk) returns the events completed by that chunk:
+    ("field", key, value) for a top-level string in `fields`,
+    ("item", key, value) for each object element of a top-level array in `arrays`.
+    """
+
+    def __init__(self, fields=("summary",), arrays=("predictions",)):
+        self.fields = set(fields)
+        self.arrays = set(arrays)
+        self.text = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_key = None       # Last top-level key seen
+        self.value_key = None      # Key whose value is being read (after ':')
+        self.container_key = None  # Key of the top-level array/object being read
+        self.item_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        text, events = self.text, []
+        for i in range(self.pos, len(text)):
+            c = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        value = json.loads(text[self.string_start:i + 1])
+                        if self.value_key is None:
+                            self.last_key = value
+                        else:
+                            if self.value_key in self.fields:
+                                events.append(("field", self.value_key, value))
+                            self.value_key = None
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c == ":" and len(self.stack) == 1:
+                self.value_key = self.last_key
+            elif c == "," and len(self.stack) == 1:
+                self.value_key = None
+            elif c in "{[":
+                self.stack.append(c)
+                if len(self.stack) == 2:
+                    self.container_key, self.value_key = self.value_key, None
+                elif len(self.stack) == 3 and self.stack[1] == "[" and c == "{" and self.container_key in self.arrays:
+                    self.item_start = i
+            elif c in "}]" and self.stack:
+                if len(self.stack) == 3 and self.item_start is not None:
+                    events.append(("item", self.container_key, json.loads(text[self.item_start:i + 1])))
+                    self.item_start = None
+                self.stack.pop()
+        self.pos = len(text)
+        return events
+
+    def result(self):
+        """The complete document (raises ValueError if the stream ended early or was invalid)."""
+        return json.loads(self.text)
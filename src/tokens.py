@@ -0,0 +1,50 @@
+import math
+import re
+
+# Local token counting for prompt budgeting. Uses tiktoken's encoding for the model when it is
+# installed; otherwise a conservative estimate (Hungarian words split into more tokens than English,
+# so it rather over- than under-counts).
+
+ENCODING_NAME = "o200k_base"  # gpt-4o
+CHARS_PER_TOKEN = 3.0
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken  # Optional dependency
+
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception:
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+def counter_name():
+    """Which counter is in use: "tiktoken" or "heuristic"."""
+    return "tiktoken" if _get_encoding() is not None else "heuristic"
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Every word costs at least one token, long words one per ~3 characters; punctuation one each
+    return sum(max(1, math.ceil(len(piece) / CHARS_PER_TOKEN)) for piece in re.findall(r"\w+|[^\w\s]", text))
+
+def truncate_lines(text, max_tokens):
+    """Keeps whole lines from the start while they fit in max_tokens (deterministic)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
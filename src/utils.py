@@ -1,171 +1,172 @@
-import requests
-import datetime
 import os
 import streamlit as st
-import pypdf
+from concurrent.futures import ThreadPoolExecutor
+from src.cache import get_cache
+from src.config import CACHE_TTLS, PDF_CANDIDATE_CHARS
+from src.fixtures import FINISHED_STATUSES, get_matches_for_date, latest_finished_fixture, sync_date
+from src.http_client import cached_api_get
+from src.model import matches_frame, model_text, predict
+from src.pdf_text import iter_file_pages, page_count, read_bytes
+from src.rate_limiter import INTERACTIVE
 
-@st.cache_data(ttl=3600) # Cache for 1 hour
+@st.cache_data(ttl=60) # Short in-process layer over the local fixture index
 def get_active_leagues_and_matches(date_str):
     """
-    Fetches ALL matches for a specific date globally, then filters them
-    to keep only the leagues we track (defined in LEAGUE_IDS).
+    Returns the matches of the leagues we track (defined in LEAGUE_IDS) for a specific date,
+    from the local fixture index, after an incremental sync (see src/fixtures.py).
     Returns a dictionary: { "Premier League (ENG)": [match_list], ... }
     """
-    from src.config import LEAGUE_IDS # Import here
+    return fetch_active_leagues_and_matches(date_str)
 
+def fetch_active_leagues_and_matches(date_str, priority=INTERACTIVE):
+    """get_active_leagues_and_matches without the Streamlit cache, usable from background threads and CLIs."""
     api_key = os.getenv("RAPIDAPI_KEY")
     if not api_key:
         return {}
 
-    # Create a reverse mapping: ID -> Name
-    # We use this to quickly identify if a match belongs to a league we care about.
-    id_to_league_name = {v: k for k, v in LEAGUE_IDS.items()}
-
-    url = "https://api-football-v1.p.rapidapi.com/v3/fixtures"
-    headers = {
-        "x-rapidapi-key": api_key,
-        "x-rapidapi-host": "api-football-v1.p.rapidapi.com"
-    }
-    
-    # Fetch ALL matches for this date
-    querystring = {"date": date_str, "timezone": "Europe/Budapest"} # Optional: set timezone to local
-
     try:
-        response = requests.get(url, headers=headers, params=querystring)
-        data = response.json()
-        
-        organized_matches = {}
-
-        if "response" in data:
-            for fixture in data["response"]:
-                league_id = fixture["fixture"]["venue"].get("id") # Warning: venue id is not league id
-                # Correct path for league id: fixture['league']['id']
-                league_id = fixture["league"]["id"]
-                
-                # Check if this league is in our tracked list
-                if league_id in id_to_league_name:
-                    league_name = id_to_league_name[league_id]
-                    
-                    match_info = {
-                        "home": fixture["teams"]["home"]["name"],
-                        "away": fixture["teams"]["away"]["name"],
-                        "home_id": fixture["teams"]["home"]["id"],
-                        "away_id": fixture["teams"]["away"]["id"],
-                        "time": fixture["fixture"]["date"][11:16], # Extract HH:MM
-                        "date": fixture["fixture"]["date"][:10],   # Extract YYYY-MM-DD
-                        "id": fixture["fixture"]["id"]
-                    }
-                    
-                    if league_name not in organized_matches:
-                        organized_matches[league_name] = []
-                    
-                    organized_matches[league_name].append(match_info)
-        
-        return organized_matches
-
+        sync_date(date_str, priority)
+        return get_matches_for_date(date_str)
     except Exception as e:
         print(f"Error fetching global matches: {e}")
         return {}
 
-def extract_text_from_pdf(uploaded_file):
+def extract_pdfs_within_budget(uploaded_files, budget_chars=PDF_CANDIDATE_CHARS):
     """
-    Extracts text from a PDF file uploaded via Streamlit.
+    Reads the uploaded PDFs page by page, in order, and stops as soon as budget_chars of text
+    (including the file headers) is collected, so the work depends on the budget, not on PDF length.
+    Returns (text, report) where report = {"pages_read", "pages_skipped", "files_skipped", "chars"}.
     """
+    uploaded_files = list(uploaded_files)
+    parts, used, pages_read = [], 0, 0
+    current_file, files_started = None, 0
+    pages = iter_file_pages(uploaded_files)
     try:
-        pdf_reader = pypdf.PdfReader(uploaded_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        return f"Error reading PDF: {str(e)}"
+        for name, index, text in pages:
+            if index == 0:
+                if current_file is not None:
+                    parts.append("\n")
+                header = f"\n--- FILE: {name} ---\n"
+                parts.append(header)
+                used += len(header)
+                current_file, files_started = name, files_started + 1
+            page = text + "\n"
+            pages_read += 1
+            if used + len(page) >= budget_chars:
+                parts.append(page[:max(budget_chars - used, 0)])
+                used = budget_chars
+                break
+            parts.append(page)
+            used += len(page)
+    finally:
+        pages.close()
 
-@st.cache_data(ttl=3600)
-def get_detailed_stats(home_id, away_id):
+    total_pages = 0
+    for uploaded_file in uploaded_files:
+        try:
+            total_pages += page_count(read_bytes(uploaded_file))
+        except Exception:
+            pass
+    report = {
+        "pages_read": pages_read,
+        "pages_skipped": max(total_pages - pages_read, 0),
+        "files_skipped": len(uploaded_files) - files_started,
+        "chars": used,
+    }
+    return "".join(parts) + "\n", report
+
+# Bounded pool for fanning out RapidAPI requests (kept below the HTTP client's connection pool size)
+STATS_WORKERS = 8
+_stats_pool = ThreadPoolExecutor(max_workers=STATS_WORKERS, thread_name_prefix="rapidapi")
+
+def pair_key(team_a, team_b):
+    """Order-independent key for a pair of teams (A-B and B-A share one H2H entry)."""
+    low, high = sorted((int(team_a), int(team_b)))
+    return f"{low}-{high}"
+
+def _is_stale(cached, fixture):
+    """True if a finished fixture is newer than everything in a cached fixture list."""
+    matches = cached.get("response") or []
+    if any(m["fixture"]["id"] == fixture["id"] for m in matches):
+        return False
+    latest = max((m["fixture"]["date"][:10] for m in matches), default="")
+    return fixture["date"] >= latest
+
+def _drop_if_outdated(namespace, key, latest_fixture):
+    """Drops a cached form/H2H entry that predates the latest finished fixture in the fixture index."""
+    if latest_fixture is None:
+        return
+    cache = get_cache()
+    cached = cache.get(namespace, key, track=False)
+    if cached is not None and _is_stale(cached, latest_fixture):
+        cache.delete(namespace, key)
+
+def fetch_team_form(team_id, priority=INTERACTIVE):
     """
-    Fetches detailed stats (Form, H2H) and calculates probabilities.
-    Returns a text summary for GPT-4o.
+    Fetches the last 5 finished matches of a team (cached per team, shared by all its fixtures).
+    The cache entry is refetched once the fixture index knows of a newer finished match.
     """
-    api_key = os.getenv("RAPIDAPI_KEY")
-    if not api_key:
-        return "No API Key available for RapidAPI stats."
-        
-    headers = {
-        "x-rapidapi-key": api_key,
-        "x-rapidapi-host": "api-football-v1.p.rapidapi.com"
-    }
-    base_url = "https://api-football-v1.p.rapidapi.com/v3"
+    _drop_if_outdated("team_form", str(team_id), latest_finished_fixture(team_id))
+    return cached_api_get(
+        # Same statuses as latest_finished_fixture, or an AET/PEN match could never be found in the entry
+        "fixtures", {"team": team_id, "last": 5, "status": "-".join(FINISHED_STATUSES)},
+        ttl=CACHE_TTLS["team_form"], namespace="team_form", key=str(team_id), priority=priority
+    )
+
+def fetch_h2h(home_id, away_id, priority=INTERACTIVE):
+    """Fetches the last 5 head-to-head matches (cached per unordered pair, refreshed like the form)."""
+    pair = pair_key(home_id, away_id)
+    _drop_if_outdated("h2h", pair, latest_finished_fixture(home_id, away_id))
+    return cached_api_get(
+        "fixtures/headtohead", {"h2h": pair, "last": 5},
+        ttl=CACHE_TTLS["h2h"], namespace="h2h", key=pair, priority=priority
+    )
+
+# Helper to calculate W/D/L %
+def _calc_form_stats(data, team_id):
+    if 'response' not in data or not data['response']:
+        return 0, 0, 0, "No Data"
     
-    # Helper to fetch last 5 matches
-    def get_form(team_id):
-        url = f"{base_url}/fixtures?team={team_id}&last=5&status=FT"
-        try:
-            return requests.get(url, headers=headers).json()
-        except:
-            return {}
-
-    # Helper to calculate W/D/L %
-    def calc_form_stats(data, team_id):
-        if 'response' not in data or not data['response']:
-            return 0, 0, 0, "No Data"
+    matches = data['response']
+    count = len(matches)
+    wins = 0
+    draws = 0
+    losses = 0
+    form_str = ""
+    
+    for m in matches:
+        goals_home = m['goals']['home']
+        goals_away = m['goals']['away']
+        # Safety check for None
+        if goals_home is None: goals_home = 0
+        if goals_away is None: goals_away = 0
         
-        matches = data['response']
-        count = len(matches)
-        wins = 0
-        draws = 0
-        losses = 0
-        form_str = ""
+        is_home_team = (m['teams']['home']['id'] == team_id)
         
-        for m in matches:
-            goals_home = m['goals']['home']
-            goals_away = m['goals']['away']
-            # Safety check for None
-            if goals_home is None: goals_home = 0
-            if goals_away is None: goals_away = 0
-            
-            is_home_team = (m['teams']['home']['id'] == team_id)
-            
-            my_goals = goals_home if is_home_team else goals_away
-            opp_goals = goals_away if is_home_team else goals_home
+        my_goals = goals_home if is_home_team else goals_away
+        opp_goals = goals_away if is_home_team else goals_home
+        
+        if my_goals > opp_goals:
+            wins += 1
+            form_str += "W"
+        elif my_goals < opp_goals:
+            losses += 1
+            form_str += "L"
+        else:
+            draws += 1
+            form_str += "D"
             
-            if my_goals > opp_goals:
-                wins += 1
-                form_str += "W"
-            elif my_goals < opp_goals:
-                losses += 1
-                form_str += "L"
-            else:
-                draws += 1
-                form_str += "D"
-                
-        return (wins/count)*100, (draws/count)*100, (losses/count)*100, form_str
-
-    # Fetch Data
-    home_data = get_form(home_id)
-    away_data = get_form(away_id)
-    
+    return (wins/count)*100, (draws/count)*100, (losses/count)*100, form_str
+
+def _build_stats_text(home_id, away_id, home_data, away_data, h2h_data, probs):
+    """Turns the fetched form and H2H data and the model probabilities into the stats summary for GPT-4o."""
     # Calculate
-    h_w, h_d, h_l, h_form = calc_form_stats(home_data, home_id)
-    a_w, a_d, a_l, a_form = calc_form_stats(away_data, away_id)
-    
-    # Algorithm: Home Prob = (Home Win + Away Loss) / 2
-    prob_home = (h_w + a_l) / 2
-    prob_away = (a_w + h_l) / 2
-    prob_draw = (h_d + a_d) / 2
-    
-    total = prob_home + prob_away + prob_draw
-    if total > 0:
-        p_h = round((prob_home / total) * 100, 1)
-        p_a = round((prob_away / total) * 100, 1)
-        p_d = round((prob_draw / total) * 100, 1)
-    else:
-        p_h, p_a, p_d = 33.3, 33.3, 33.3
+    h_w, h_d, h_l, h_form = _calc_form_stats(home_data, home_id)
+    a_w, a_d, a_l, a_form = _calc_form_stats(away_data, away_id)
 
     # H2H
-    h2h_url = f"{base_url}/fixtures/headtohead?h2h={home_id}-{away_id}&last=5"
     try:
-        h2h_data = requests.get(h2h_url, headers=headers).json()
-        h2h_text = ""
+        h2h_text = "" if h2h_data else "No H2H Data"
         if 'response' in h2h_data:
             for m in h2h_data['response']:
                 d = m['fixture']['date'][:10]
@@ -176,16 +177,95 @@ def get_detailed_stats(home_id, away_id):
     except:
         h2h_text = "No H2H Data"
 
+    model_block = model_text(probs).replace("\n", "\n    ") if probs else "POISSON MODEL: No Data"
+
     return f"""
     OFFICIAL RAPIDAPI STATS:
     HOME FORM (Last 5): {h_form} (Win {h_w}% | Draw {h_d}% | Loss {h_l}%)
     AWAY FORM (Last 5): {a_form} (Win {a_w}% | Draw {a_d}% | Loss {a_l}%)
     
-    CALCULATED PROBABILITIES (Based on Form):
-    HOME WIN: {p_h}%
-    DRAW: {p_d}%
-    AWAY WIN: {p_a}%
+    {model_block}
     
     HEAD-TO-HEAD (Last 5):
     {h2h_text}
     """
+
+def _result_or_empty(future):
+    """A stats request's result, or {} (shown as "No Data") if it failed, so one bad request spoils nothing else."""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Error fetching stats: {e}")
+        return {}
+
+@st.cache_data(ttl=300)
+def get_detailed_stats(home_id, away_id):
+    """
+    Fetches detailed stats (Form, H2H) and the model's market probabilities.
+    The three requests run concurrently, so latency is roughly one round trip.
+    Returns a text summary for GPT-4o.
+    """
+    api_key = os.getenv("RAPIDAPI_KEY")
+    if not api_key:
+        return "No API Key available for RapidAPI stats."
+
+    home_future = _stats_pool.submit(fetch_team_form, home_id)
+    away_future = _stats_pool.submit(fetch_team_form, away_id)
+    h2h_future = _stats_pool.submit(fetch_h2h, home_id, away_id)
+    home_data, away_data, h2h_data = _result_or_empty(home_future), _result_or_empty(away_future), _result_or_empty(h2h_future)
+
+    fixture = {"id": 0, "home_id": home_id, "away_id": away_id}
+    probs = predict([fixture], matches_frame([home_data, away_data, h2h_data])).get(0)
+    return _build_stats_text(home_id, away_id, home_data, away_data, h2h_data, probs)
+
+def _fetch_slate(fixtures, priority):
+    """
+    Fetches form and H2H for a list of fixtures (dicts with id, home_id, away_id) in one concurrent sweep.
+    Each team's form and each unordered pair's H2H is requested once, however many fixtures share it.
+    Returns ({team_id: form_data}, {pair_key: h2h_data}).
+    """
+    team_ids = {f["home_id"] for f in fixtures} | {f["away_id"] for f in fixtures}
+    form_futures = {team_id: _stats_pool.submit(fetch_team_form, team_id, priority) for team_id in team_ids}
+    pairs = {pair_key(f["home_id"], f["away_id"]): (f["home_id"], f["away_id"]) for f in fixtures}
+    h2h_futures = {pair: _stats_pool.submit(fetch_h2h, *teams, priority) for pair, teams in pairs.items()}
+    return ({team_id: _result_or_empty(f) for team_id, f in form_futures.items()},
+            {pair: _result_or_empty(f) for pair, f in h2h_futures.items()})
+
+@st.cache_data(ttl=300)
+def get_detailed_stats_bulk(fixtures):
+    """
+    Stats text for a list of fixtures (dicts with id, home_id, away_id), fetched in one concurrent sweep
+    and modelled in one batched pass. Returns { fixture_id: stats_text }.
+    """
+    return fetch_detailed_stats_bulk(fixtures)
+
+def fetch_detailed_stats_bulk(fixtures, priority=INTERACTIVE):
+    """get_detailed_stats_bulk without the Streamlit cache, usable from background threads and CLIs."""
+    api_key = os.getenv("RAPIDAPI_KEY")
+    if not api_key:
+        return {f["id"]: "No API Key available for RapidAPI stats." for f in fixtures}
+
+    forms, h2hs = _fetch_slate(fixtures, priority)
+    probs = predict(fixtures, matches_frame(list(forms.values()) + list(h2hs.values())))
+    return {
+        f["id"]: _build_stats_text(
+            f["home_id"], f["away_id"], forms[f["home_id"]], forms[f["away_id"]],
+            h2hs[pair_key(f["home_id"], f["away_id"])], probs.get(f["id"])
+        )
+        for f in fixtures
+    }
+
+@st.cache_data(ttl=300)
+def get_model_probabilities(fixtures):
+    """
+    No-LLM fast path: the Poisson model's market probabilities for a list of fixtures
+    (a whole day's slate in one batched pass). Returns { fixture_id: probabilities } (see src/model.py).
+    """
+    return fetch_model_probabilities(fixtures)
+
+def fetch_model_probabilities(fixtures, priority=INTERACTIVE):
+    """get_model_probabilities without the Streamlit cache."""
+    if not fixtures or not os.getenv("RAPIDAPI_KEY"):
+        return {}
+    forms, h2hs = _fetch_slate(fixtures, priority)
+    return predict(fixtures, matches_frame(list(forms.values()) + list(h2hs.values())))